@@ -1,21 +1,25 @@
 import os
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import requests
 from datetime import datetime
 import json
 import asyncio
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
 import google.generativeai as genai
 from dotenv import load_dotenv
-from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
-from websocket_manager import websocket_manager
+from websocket_manager import websocket_manager, ChatChunkMessage, ChatResponseMessage
+from response_cache import ResponseCache
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging with more detail
+# Configure logging; set LOG_LEVEL=DEBUG for more detail
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=os.getenv('LOG_LEVEL', 'INFO').upper(),
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
@@ -27,6 +31,94 @@ if not GEMINI_API_KEY:
     raise ValueError("GEMINI_API_KEY environment variable is required")
 logger.info("API Key loaded successfully")
 
+# HuggingFace fallback model, loaded on first use and shared across AIService instances
+FALLBACK_MODEL_NAME = "gpt2"
+_fallback_lock = threading.Lock()
+_fallback_tokenizer = None
+_fallback_model = None
+# After a failed load, requests skip the fallback for this long before it is tried again
+FALLBACK_RETRY_SECONDS = 300
+_fallback_failed_at = None
+QUANTIZED_FALLBACK_FILE = "gpt2-int8.pt"
+
+# Per-user Gemini chat sessions are dropped after this much idle time, or when the cache is full
+CHAT_SESSION_TTL_SECONDS = 30 * 60
+MAX_CHAT_SESSIONS = 1000
+
+# Conversation history entries are (turn type, content, epoch seconds) tuples
+USER_TURN = 0
+ASSISTANT_TURN = 1
+MAX_HISTORY_ENTRIES = 10
+
+# Tokenized fallback prompt prefixes kept per distinct module content
+MAX_CACHED_PREFIXES = 64
+FALLBACK_MAX_INPUT_TOKENS = 512
+
+
+def _linearize_conv1d(model):
+    """Swap GPT-2's Conv1D projections for nn.Linear so dynamic quantization can reach them"""
+    import torch
+    from transformers.pytorch_utils import Conv1D
+
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, Conv1D):
+                # Conv1D stores its weight as (in_features, out_features)
+                in_features, out_features = child.weight.shape
+                linear = torch.nn.Linear(in_features, out_features)
+                linear.weight = torch.nn.Parameter(child.weight.detach().t().contiguous())
+                linear.bias = torch.nn.Parameter(child.bias.detach())
+                setattr(parent, name, linear)
+    return model
+
+
+def _load_fallback_model():
+    """Load the fallback tokenizer and an INT8 dynamically-quantized model"""
+    import torch
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+
+    # Point TRANSFORMERS_CACHE at a persistent volume to avoid re-downloading on restart
+    cache_dir = os.getenv('TRANSFORMERS_CACHE')
+    tokenizer = AutoTokenizer.from_pretrained(FALLBACK_MODEL_NAME, cache_dir=cache_dir)
+
+    quantized_path = os.path.join(cache_dir, QUANTIZED_FALLBACK_FILE) if cache_dir else None
+    if quantized_path and os.path.exists(quantized_path):
+        logger.info("Loading quantized fallback model from %s", quantized_path)
+        model = torch.load(quantized_path, weights_only=False)
+    else:
+        model = AutoModelForCausalLM.from_pretrained(FALLBACK_MODEL_NAME, cache_dir=cache_dir)
+        # Quantize Linear layers to int8; embeddings and LayerNorm stay in fp32
+        model = torch.quantization.quantize_dynamic(
+            _linearize_conv1d(model), {torch.nn.Linear}, dtype=torch.qint8
+        )
+        if quantized_path:
+            torch.save(model, quantized_path)
+    model.eval()
+    _compile_fallback_model(model, tokenizer)
+    return tokenizer, model
+
+
+def _compile_fallback_model(model, tokenizer):
+    """Compile the model's forward pass and warm it up so the first request doesn't pay for it"""
+    import torch
+
+    eager_forward = model.forward
+    try:
+        # generate() calls self.forward, so compile that rather than wrapping the module;
+        # "reduce-overhead" relies on CUDA graphs and gains nothing on CPU
+        model.forward = torch.compile(eager_forward, dynamic=True)
+        with torch.no_grad():
+            model.generate(
+                torch.tensor([[tokenizer.eos_token_id]]),
+                max_length=4,
+                pad_token_id=tokenizer.eos_token_id
+            )
+        logger.info("Fallback model compiled with torch.compile")
+    except Exception as compile_error:
+        # torch.compile needs a working C++ toolchain; run eagerly without one
+        logger.warning("torch.compile unavailable, using eager fallback model: %s", compile_error)
+        model.forward = eager_forward
+
 class AIService:
     def __init__(self):
         try:
@@ -39,13 +131,15 @@ class AIService:
             logger.info("Attempting to configure Gemini API...")
             try:
                 genai.configure(api_key=self.api_key, transport="rest")
-                # Initialize with a more stable API version
-                generation_config = {
-                    "temperature": 0.7,
-                    "top_p": 1,
-                    "top_k": 1,
-                    "max_output_tokens": 2048,
-                }
+
+                # Initialize the model with the correct API version
+                generation_config = genai.types.GenerationConfig(
+                    temperature=0.7,
+                    top_p=1,
+                    top_k=1,
+                    max_output_tokens=2048,
+                    candidate_count=1
+                )
                 safety_settings = [
                     {
                         "category": "HARM_CATEGORY_HARASSMENT",
@@ -54,205 +148,283 @@ class AIService:
                     {
                         "category": "HARM_CATEGORY_HATE_SPEECH",
                         "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                    }
+                    },
+                    {
+                        "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+                        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+                    },
+                    {
+                        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+                        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+                    },
                 ]
-                
-                # List available models first
-                available_models = genai.list_models()
-                model_found = False
-                for model in available_models:
-                    logger.info(f"Available model: {model.name}")
-                    if "gemini-pro" in model.name:
-                        model_found = True
-                        break
-                
-                if not model_found:
-                    logger.warning("Gemini Pro model not found in available models")
-                    raise ValueError("Gemini Pro model not available")
-                
-                # Initialize and test with the main model instead of a separate test model
                 self.model = genai.GenerativeModel(
                     model_name="models/gemini-1.5-flash",
                     generation_config=generation_config,
                     safety_settings=safety_settings
                 )
+
+                # The probe costs two Gemini round-trips on every worker start, so it is opt-in;
+                # otherwise authentication problems surface on the first real request
+                if os.getenv('DEBUG_STARTUP_PROBE', '').lower() in ('1', 'true', 'yes'):
+                    # List available models first
+                    available_models = genai.list_models()
+                    model_found = False
+                    for model in available_models:
+                        logger.info("Available model: %s", model.name)
+                        if "gemini-pro" in model.name:
+                            model_found = True
+                            break
+                
+                    if not model_found:
+                        logger.warning("Gemini Pro model not found in available models")
+                        raise ValueError("Gemini Pro model not available")
                 
-                # Test with a simple prompt
-                test_response = self.model.generate_content('Test')
-                if not test_response:
-                    raise ValueError("Failed to get response from Gemini API")
-                logger.info("Gemini API configured and tested successfully")
+                    # Test with a simple prompt
+                    test_response = self.model.generate_content('Test')
+                    if not test_response:
+                        raise ValueError("Failed to get response from Gemini API")
+                    logger.info("Gemini API configured and tested successfully")
             except Exception as api_error:
-                logger.error(f"Failed to configure Gemini API: {str(api_error)}")
+                logger.error("Failed to configure Gemini API: %s", api_error)
                 raise
 
-            # Initialize the model with the correct API version
-            generation_config = genai.types.GenerationConfig(
-                temperature=0.7,
-                top_p=1,
-                top_k=1,
-                max_output_tokens=2048,
-                candidate_count=1
-            )
-            
-            # Initialize HuggingFace models
-            try:
-                logger.info("Initializing HuggingFace fallback model...")
-                model_name = "gpt2"  # Using a more reliable and lightweight model
-                self.fallback_tokenizer = AutoTokenizer.from_pretrained(model_name)
-                self.fallback_model = AutoModelForCausalLM.from_pretrained(model_name)
-                logger.info("HuggingFace fallback model initialized successfully")
-            except Exception as hf_error:
-                logger.warning(f"Failed to initialize HuggingFace model: {str(hf_error)}")
-                self.fallback_model = None
-                self.fallback_tokenizer = None
-                # Log detailed error for debugging
-                logger.error(f"Detailed HuggingFace error: {str(hf_error)}", exc_info=True)
-            safety_settings = [
-                {
-                    "category": "HARM_CATEGORY_HARASSMENT",
-                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                },
-                {
-                    "category": "HARM_CATEGORY_HATE_SPEECH",
-                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                },
-                {
-                    "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                },
-                {
-                    "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                },
-            ]
-            self.model = genai.GenerativeModel(
-                model_name="models/gemini-1.5-flash",
-                generation_config=generation_config,
-                safety_settings=safety_settings
-            )
+            # HuggingFace fallback is loaded lazily by _ensure_fallback()
+            self.fallback_model = None
+            self.fallback_tokenizer = None
+            # module_content -> tokenized "Context: ...\nQuestion:" prefix
+            self._prefix_cache = {}
+            self._prefix_lock = threading.Lock()
+            # user_id -> bounded deque of history entries
             self.conversation_history = {}
+            # user_id -> {'chat', 'context', 'last_used'}, ordered from least to most recently used
+            self.chat_sessions = OrderedDict()
+            # user_id -> asyncio.Lock serialising that user's Gemini sends; an entry goes away
+            # once no request holds or waits on it
+            self._session_locks = weakref.WeakValueDictionary()
+            self.response_cache = ResponseCache()
             logger.info("AITutorService initialized successfully with API key")
         except Exception as e:
-            logger.error(f"Failed to initialize Gemini API: {str(e)}")
+            logger.error("Failed to initialize Gemini API: %s", e)
             raise
 
-    def generate_response(self, user_id: str, module_content: str, question: str) -> Dict[str, Any]:
+    def _ensure_fallback(self) -> bool:
+        """Load the HuggingFace fallback model on first use"""
+        global _fallback_tokenizer, _fallback_model, _fallback_failed_at
+        if self.fallback_model is not None and self.fallback_tokenizer is not None:
+            return True
+
+        with _fallback_lock:
+            if _fallback_model is None:
+                # Don't repeat the download, quantization and compile on every request while
+                # it keeps failing, e.g. with HuggingFace unreachable during a Gemini outage
+                if _fallback_failed_at is not None and time.monotonic() - _fallback_failed_at < FALLBACK_RETRY_SECONDS:
+                    return False
+                try:
+                    logger.info("Initializing HuggingFace fallback model...")
+                    _fallback_tokenizer, _fallback_model = _load_fallback_model()
+                    _fallback_failed_at = None
+                    logger.info("HuggingFace fallback model initialized successfully")
+                except Exception as hf_error:
+                    _fallback_failed_at = time.monotonic()
+                    logger.error(
+                        "Failed to initialize HuggingFace model, retrying in %ds: %s",
+                        FALLBACK_RETRY_SECONDS, hf_error, exc_info=True
+                    )
+                    return False
+
+            self.fallback_tokenizer = _fallback_tokenizer
+            self.fallback_model = _fallback_model
+        return True
+
+    def _history_view(self, user_id: str):
+        """Yield a user's recent turns in Gemini chat history format"""
+        for turn_type, content, _ in self.conversation_history.get(user_id, ()):
+            yield {"role": "user" if turn_type == USER_TURN else "model", "parts": [content]}
+
+    def _session_lock(self, user_id: str) -> asyncio.Lock:
+        lock = self._session_locks.get(user_id)
+        if lock is None:
+            lock = self._session_locks[user_id] = asyncio.Lock()
+        return lock
+
+    def _get_chat_session(self, user_id: str, module_content: str):
+        """Return the cached Gemini chat session for a user, starting one on first use"""
+        now = time.monotonic()
+
+        # Evict idle sessions, oldest first, and keep the cache bounded
+        while self.chat_sessions:
+            oldest_id, oldest = next(iter(self.chat_sessions.items()))
+            if (now - oldest['last_used'] < CHAT_SESSION_TTL_SECONDS
+                    and len(self.chat_sessions) < MAX_CHAT_SESSIONS):
+                break
+            del self.chat_sessions[oldest_id]
+
+        session = self.chat_sessions.get(user_id)
+        if session is None or session['context'] != module_content:
+            # Seed the session with the module context once instead of resending it every turn,
+            # followed by any recent turns so a rebuilt session keeps the conversation
+            context = f"You are a helpful financial tutor. Use the following context to help answer the user's questions: {module_content}"
+            session = {
+                'chat': self.model.start_chat(history=[
+                    {"role": "user", "parts": [context]},
+                    {"role": "model", "parts": ["Understood. I'll use this context to answer your questions."]},
+                    *self._history_view(user_id)
+                ]),
+                'context': module_content
+            }
+            self.chat_sessions[user_id] = session
+            logger.debug("Started new chat session for user %s", user_id)
+
+        session['last_used'] = now
+        self.chat_sessions.move_to_end(user_id)
+        return session['chat']
+
+    def _generate_fallback(self, module_content: str, question: str) -> str:
+        """Generate a response with the local HuggingFace model"""
+        # Load the HuggingFace model on first fallback
+        if not self._ensure_fallback():
+            raise Exception("HuggingFace model not initialized")
+
+        import torch
+
+        # The context prefix is tokenized once per module; only the question is tokenized per call
+        with self._prefix_lock:
+            prefix_ids = self._prefix_cache.get(module_content)
+        if prefix_ids is None:
+            prefix_ids = self.fallback_tokenizer(
+                f"Context: {module_content}\nQuestion:", return_tensors="pt"
+            )["input_ids"]
+            with self._prefix_lock:
+                if len(self._prefix_cache) >= MAX_CACHED_PREFIXES:
+                    self._prefix_cache.pop(next(iter(self._prefix_cache)))
+                self._prefix_cache[module_content] = prefix_ids
+
+        question_ids = self.fallback_tokenizer(f" {question}\nAnswer:", return_tensors="pt")["input_ids"]
+        input_ids = torch.cat([prefix_ids, question_ids], dim=1)[:, :FALLBACK_MAX_INPUT_TOKENS]
+
+        # Generate response
+        outputs = self.fallback_model.generate(
+            input_ids,
+            max_length=200,
+            num_return_sequences=1,
+            no_repeat_ngram_size=2,
+            temperature=0.7,
+            top_p=0.9,
+            pad_token_id=self.fallback_tokenizer.eos_token_id
+        )
+
+        # Decode the response
+        return self.fallback_tokenizer.decode(outputs[0], skip_special_tokens=True)
+
+    async def generate_response(self, user_id: str, module_content: str, question: str) -> Dict[str, Any]:
         """Generate AI response using primary (Gemini) or fallback model"""
+        # One timestamp for the whole request
+        now = time.time()
+        timestamp = datetime.fromtimestamp(now).isoformat()
         try:
-            logger.info(f"Generating response for user {user_id}")
+            logger.debug("Generating response for user %s", user_id)
             
             # Get conversation history for this user
             if user_id not in self.conversation_history:
-                self.conversation_history[user_id] = []
-                logger.debug(f"Created new conversation history for user {user_id}")
+                self.conversation_history[user_id] = deque(maxlen=MAX_HISTORY_ENTRIES)
+                logger.debug("Created new conversation history for user %s", user_id)
+
+            # Repeated opening questions on the same module are answered from the cache.
+            # Later turns depend on the user's own conversation, so they always go to the model;
+            # a cached opening turn still reaches Gemini through the history a new session is seeded with.
+            # Hashing the module content is done off the event loop
+            first_turn = not self.conversation_history[user_id]
+            cached_content = (
+                await asyncio.to_thread(self.response_cache.get, module_content, question)
+                if first_turn else None
+            )
 
             try:
+                if cached_content is not None:
+                    content = cached_content
+                    model_used = "cache"
                 # Try Gemini first
-                if self.api_key and self.api_key != 'your-default-api-key-here':
-                    # Prepare the context and prompt
-                    context = f"You are a helpful financial tutor. Use the following context to help answer the user's questions: {module_content}"
-                    
-                    # Create chat history format
-                    chat = self.model.start_chat(history=[
-                        {"role": "user", "parts": [msg["content"]]}
-                        if msg["type"] == "user" else
-                        {"role": "model", "parts": [msg["content"]]}
-                        for msg in self.conversation_history[user_id][-5:]
-                    ])
-                    
-                    # Generate response
-                    response = chat.send_message(f"{context}\n\nUser: {question}")
-                    
-                    if response and hasattr(response, 'text'):
-                        content = response.text
-                        model_used = "Gemini"
-                    else:
-                        raise Exception("Invalid response from Gemini")
+                elif self.api_key and self.api_key != 'your-default-api-key-here':
+                    # A chat session takes one message at a time, so a user's overlapping requests
+                    # wait their turn instead of sending while an earlier reply is still streaming
+                    async with self._session_lock(user_id):
+                        # Only the new turn is sent; earlier turns live in the cached session
+                        chat = self._get_chat_session(user_id, module_content)
+                        try:
+                            response = await chat.send_message_async(question, stream=True)
+
+                            # Push each chunk to the client as it arrives and keep the full text for history
+                            parts = []
+                            async for chunk in response:
+                                text = getattr(chunk, 'text', '')
+                                if not text:
+                                    continue
+                                parts.append(text)
+                                websocket_manager.enqueue(user_id, ChatChunkMessage(content=text, timestamp=timestamp))
+                            if not parts:
+                                raise Exception("Invalid response from Gemini")
+                        except Exception:
+                            # Start from a fresh session next time in case this one is in a bad state;
+                            # done under the lock so a session another request started is left alone
+                            self.chat_sessions.pop(user_id, None)
+                            raise
+
+                    content = ''.join(parts)
+                    model_used = "Gemini"
+                    if first_turn:
+                        await asyncio.to_thread(self.response_cache.add, module_content, question, content)
                 else:
                     raise Exception("Gemini API key not configured")
                     
             except Exception as gemini_error:
-                logger.warning(f"Gemini API error, falling back to HuggingFace: {str(gemini_error)}")
+                logger.warning("Gemini API error, falling back to HuggingFace: %s", gemini_error)
                 try:
-                    # Check if HuggingFace model is available
-                    if self.fallback_model and self.fallback_tokenizer:
-                        # Prepare input for the model
-                        context_prompt = f"Context: {module_content}\nQuestion: {question}\nAnswer:"
-                        inputs = self.fallback_tokenizer(context_prompt, return_tensors="pt", truncation=True, max_length=512)
-                        
-                        # Generate response
-                        outputs = self.fallback_model.generate(
-                            inputs["input_ids"],
-                            max_length=200,
-                            num_return_sequences=1,
-                            no_repeat_ngram_size=2,
-                            temperature=0.7,
-                            top_p=0.9,
-                            pad_token_id=self.fallback_tokenizer.eos_token_id
-                        )
-                        
-                        # Decode the response
-                        content = self.fallback_tokenizer.decode(outputs[0], skip_special_tokens=True)
-                        model_used = "HuggingFace"
-                    else:
-                        raise Exception("HuggingFace model not initialized")
+                    # Model loading and generation are CPU-bound, keep them off the event loop
+                    content = await asyncio.to_thread(self._generate_fallback, module_content, question)
+                    model_used = "HuggingFace"
                     
                 except Exception as fallback_error:
-                    logger.error(f"Fallback model error: {str(fallback_error)}")
-                    return self._generate_simulated_response(question, module_content)
-
-            # Create message and update history
-            message = {
-                'type': 'assistant',
-                'content': content,
-                'timestamp': datetime.now().isoformat(),
-                'model': model_used
-            }
+                    logger.error("Fallback model error: %s", fallback_error)
+                    return self._generate_simulated_response(question, module_content, timestamp)
 
             # Update conversation history
-            self.conversation_history[user_id].append({
-                'type': 'user',
-                'content': question,
-                'timestamp': datetime.now().isoformat()
-            })
-            self.conversation_history[user_id].append(message)
+            history = self.conversation_history[user_id]
+            history.append((USER_TURN, question, now))
+            history.append((ASSISTANT_TURN, content, now))
             
             # Broadcast the message through WebSocket
-            asyncio.create_task(websocket_manager.broadcast_to_user(user_id, {
-                'type': 'chat_response',
-                'content': content,
-                'model': model_used,
-                'timestamp': message['timestamp']
-            }))
+            websocket_manager.enqueue(
+                user_id, ChatResponseMessage(content=content, model=model_used, timestamp=timestamp)
+            )
             
             return {
                 'status': 'success',
                 'message': content,
                 'model': model_used,
-                'timestamp': message['timestamp']
+                'timestamp': timestamp
             }
                 
         except Exception as e:
-            logger.error(f"Unexpected error in generate_response: {str(e)}", exc_info=True)
+            logger.error("Unexpected error in generate_response: %s", e, exc_info=True)
             return {
                 'status': 'error',
                 'message': f'An error occurred while processing your request: {str(e)}',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': timestamp
             }
 
-    def _generate_simulated_response(self, question: str, module_content: str) -> Dict[str, Any]:
+    def _generate_simulated_response(self, question: str, module_content: str, timestamp: Optional[str] = None) -> Dict[str, Any]:
         """Generate a simulated response for testing/development"""
         return {
             'status': 'success',
             'message': 'This is a simulated response for testing. Please configure a valid API key for production use.',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': timestamp or datetime.now().isoformat()
         }
 
     def get_personalized_recommendations(self, user_id: str, user_progress: Dict[str, Any]) -> Dict[str, Any]:
         """Get personalized learning recommendations based on user progress"""
         try:
-            logger.info(f"Generating personalized recommendations for user {user_id}")
+            logger.info("Generating personalized recommendations for user %s", user_id)
             
             # Use Gemini to analyze user progress and generate recommendations
             prompt = f"Based on the user's progress: {json.dumps(user_progress)}, suggest personalized learning recommendations for financial education."
@@ -276,11 +448,11 @@ class AIService:
                     }
                 }
             except Exception as e:
-                logger.error(f"Error parsing recommendations: {str(e)}")
+                logger.error("Error parsing recommendations: %s", e)
                 return self._get_default_recommendations()
 
         except Exception as e:
-            logger.error(f"Error getting personalized recommendations: {str(e)}")
+            logger.error("Error getting personalized recommendations: %s", e)
             return self._get_default_recommendations()
 
     def _get_default_recommendations(self) -> Dict[str, Any]:
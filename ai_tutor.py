@@ -1,6 +1,40 @@
 import logging
-from typing import Dict
-import json
+import re
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, Optional, Set, Tuple
+import orjson
+
+# Number of parsed course contexts kept by AITutor
+MAX_CACHED_CONTEXTS = 64
+# Query keywords whose matching modules are remembered, per course context
+MAX_CACHED_KEYWORDS = 4096
+
+# Canned answers, shared read-only by every AITutor
+_DEFINITIONS: Mapping[str, str] = MappingProxyType({
+    "stock": "A stock represents ownership in a company and a claim on part of that company's earnings and assets.",
+    "bond": "A bond is a fixed income instrument that represents a loan made by an investor to a borrower.",
+    "mutual fund": "A mutual fund is a company that pools money from many investors and invests it in securities like stocks, bonds, and short-term debt.",
+    "dividend": "A dividend is a distribution of profits by a corporation to its shareholders.",
+    "market cap": "Market capitalization is the total value of a company's shares of stock."
+})
+
+_HOW_TO: Mapping[str, str] = MappingProxyType({
+    "invest": "To start investing: 1. Set your goals 2. Determine your risk tolerance 3. Choose your investment strategy 4. Select appropriate investments 5. Monitor and adjust your portfolio",
+    "save": "To save effectively: 1. Create a budget 2. Track your expenses 3. Set savings goals 4. Automate your savings 5. Reduce unnecessary expenses",
+    "budget": "To create a budget: 1. Calculate your income 2. Track your expenses 3. Set financial goals 4. Create spending categories 5. Monitor and adjust regularly"
+})
+
+_EXPLANATIONS: Mapping[str, str] = MappingProxyType({
+    "risk": "Risk in investing refers to the possibility of losing some or all of your investment. It's often measured by volatility - how much an investment's value changes over time.",
+    "diversification": "Diversification is a risk management strategy that involves spreading your investments across different assets to reduce exposure to any single asset or risk.",
+    "compound interest": "Compound interest is when you earn interest on both your initial investment and previously earned interest, leading to exponential growth over time."
+})
+
+_COMPARISONS: Mapping[str, str] = MappingProxyType({
+    "stocks bonds": "Stocks represent ownership in a company and typically offer higher potential returns with higher risk. Bonds are loans to companies or governments and typically offer lower, more stable returns with lower risk.",
+    "saving investing": "Saving typically involves putting money in a safe place with minimal risk and lower returns. Investing involves putting money into assets with the potential for higher returns but also higher risk.",
+    "bull bear": "A bull market is when stock prices are rising and market sentiment is optimistic. A bear market is when stock prices are falling and sentiment is pessimistic."
+})
 
 class AITutor:
     def __init__(self):
@@ -13,40 +47,102 @@ class AITutor:
             "fundamental": ["P/E ratio", "earnings", "revenue", "market cap", "valuation"]
         }
 
-    def is_finance_related(self, query: str) -> bool:
+        # Question types, checked in order
+        self.question_types = {
+            "what is": self._handle_definition_question,
+            "how to": self._handle_how_to_question,
+            "explain": self._handle_explanation_question,
+            "difference between": self._handle_comparison_question
+        }
+
+        self._build_term_matcher()
+
+        # course_context JSON -> (module contents, lower-cased contents, keyword -> module indexes)
+        self._context_cache: Dict[str, Tuple[List[str], List[str], Dict[str, FrozenSet[int]]]] = {}
+
+    def _build_term_matcher(self):
+        """Compile every keyword the tutor looks for into a single regex scanned once per query"""
+        self.finance_terms = set(self.finance_keywords)
+        for terms in self.finance_keywords.values():
+            self.finance_terms.update(terms)
+
+        all_terms = set(self.finance_terms)
+        all_terms.update(self.question_types, _DEFINITIONS, _HOW_TO, _EXPLANATIONS)
+        for terms in _COMPARISONS:
+            all_terms.update(terms.split())
+
+        # The lookahead reports the longest term starting at every position; any shorter term
+        # found there is a prefix of it, so expanding each match to the terms it contains gives
+        # exactly the set of terms for which `term in query` holds
+        alternation = "|".join(re.escape(term) for term in sorted(all_terms, key=len, reverse=True))
+        self._term_pattern = re.compile(f"(?=({alternation}))")
+        self._contained_terms = {
+            term: frozenset(other for other in all_terms if other in term)
+            for term in all_terms
+        }
+
+    def _match_terms(self, query_lower: str) -> Set[str]:
+        """Return every known keyword that occurs in the query"""
+        matched = set()
+        for match in self._term_pattern.finditer(query_lower):
+            matched |= self._contained_terms[match.group(1)]
+        return matched
+
+    def _get_course_index(self, course_context: str) -> Tuple[List[str], List[str], Dict[str, FrozenSet[int]]]:
+        """Parse a course context once; returns module contents, their lower-cased text, and an
+        initially empty keyword -> module indexes memo that get_response fills as queries come in"""
+        cached = self._context_cache.get(course_context)
+        if cached is not None:
+            return cached
+
+        context = orjson.loads(course_context)
+        contents = [module.get("content", "") for module in context.get("modules", [])]
+        lowered = [content.lower() for content in contents]
+
+        if len(self._context_cache) >= MAX_CACHED_CONTEXTS:
+            # Drop the oldest parsed course
+            del self._context_cache[next(iter(self._context_cache))]
+        cached = self._context_cache[course_context] = (contents, lowered, {})
+        return cached
+
+    def _modules_containing(self, keyword: str, lowered: List[str], memo: Dict[str, FrozenSet[int]]) -> FrozenSet[int]:
+        """Indexes of the modules whose text contains the keyword anywhere, so "stock" still
+        finds "Stocks" and "invest" finds "investments"; each keyword is scanned for once per course"""
+        modules = memo.get(keyword)
+        if modules is None:
+            modules = frozenset(module_idx for module_idx, content in enumerate(lowered) if keyword in content)
+            if len(memo) < MAX_CACHED_KEYWORDS:
+                memo[keyword] = modules
+        return modules
+
+    def is_finance_related(self, query: str, matched_terms: Optional[Set[str]] = None) -> bool:
         """Check if the query is related to finance"""
-        query_lower = query.lower()
-        
-        # Check direct keywords
-        for category, terms in self.finance_keywords.items():
-            if category in query_lower or any(term in query_lower for term in terms):
-                return True
-                
-        return False
+        if matched_terms is None:
+            matched_terms = self._match_terms(query.lower())
+        return not self.finance_terms.isdisjoint(matched_terms)
 
     def get_response(self, query: str, course_context: str) -> dict:
         """Generate a response to a user query"""
         try:
+            query_lower = query.lower()
+            matched_terms = self._match_terms(query_lower)
+
             # Check if query is finance-related
-            if not self.is_finance_related(query):
+            if not self.is_finance_related(query, matched_terms):
                 return {
                     "response": "I can only answer questions related to finance and the current course material.",
                     "relevant": False
                 }
 
-            # Parse course context
-            context = json.loads(course_context)
-            query_lower = query.lower()
-            
-            # Find relevant module content
-            relevant_content = []
-            for module in context.get("modules", []):
-                module_content = module.get("content", "").lower()
-                if any(keyword in module_content for keyword in query_lower.split()):
-                    relevant_content.append(module.get("content"))
+            # Find relevant module content: modules containing any of the query's words
+            contents, lowered, memo = self._get_course_index(course_context)
+            matched_modules = set()
+            for keyword in set(query_lower.split()):
+                matched_modules |= self._modules_containing(keyword, lowered, memo)
+            relevant_content = [contents[module_idx] for module_idx in sorted(matched_modules)]
 
             # Generate response based on context and predefined answers
-            response = self._generate_contextual_response(query_lower, relevant_content)
+            response = self._generate_contextual_response(query_lower, relevant_content, matched_terms)
             
             return {
                 "response": response,
@@ -60,20 +156,12 @@ class AITutor:
                 "relevant": False
             }
 
-    def _generate_contextual_response(self, query: str, relevant_content: list) -> str:
+    def _generate_contextual_response(self, query: str, relevant_content: list, matched_terms: Set[str]) -> str:
         """Generate a contextual response based on the query and available content"""
-        # Common financial questions and answers
-        qa_pairs = {
-            "what is": self._handle_definition_question,
-            "how to": self._handle_how_to_question,
-            "explain": self._handle_explanation_question,
-            "difference between": self._handle_comparison_question
-        }
-        
         # Find matching question type
-        for question_type, handler in qa_pairs.items():
-            if question_type in query:
-                return handler(query, relevant_content)
+        for question_type, handler in self.question_types.items():
+            if question_type in matched_terms:
+                return handler(matched_terms, relevant_content)
         
         # Default response using relevant content
         if relevant_content:
@@ -81,60 +169,34 @@ class AITutor:
         else:
             return "I understand your question is about finance, but I need more specific information to provide a helpful answer."
 
-    def _handle_definition_question(self, query: str, content: list) -> str:
+    def _handle_definition_question(self, matched_terms: Set[str], content: list) -> str:
         """Handle 'what is' type questions"""
-        definitions = {
-            "stock": "A stock represents ownership in a company and a claim on part of that company's earnings and assets.",
-            "bond": "A bond is a fixed income instrument that represents a loan made by an investor to a borrower.",
-            "mutual fund": "A mutual fund is a company that pools money from many investors and invests it in securities like stocks, bonds, and short-term debt.",
-            "dividend": "A dividend is a distribution of profits by a corporation to its shareholders.",
-            "market cap": "Market capitalization is the total value of a company's shares of stock."
-        }
-        
-        for term, definition in definitions.items():
-            if term in query:
+        for term, definition in _DEFINITIONS.items():
+            if term in matched_terms:
                 return definition
                 
         return self._get_content_based_response(content)
 
-    def _handle_how_to_question(self, query: str, content: list) -> str:
+    def _handle_how_to_question(self, matched_terms: Set[str], content: list) -> str:
         """Handle 'how to' type questions"""
-        how_to_guides = {
-            "invest": "To start investing: 1. Set your goals 2. Determine your risk tolerance 3. Choose your investment strategy 4. Select appropriate investments 5. Monitor and adjust your portfolio",
-            "save": "To save effectively: 1. Create a budget 2. Track your expenses 3. Set savings goals 4. Automate your savings 5. Reduce unnecessary expenses",
-            "budget": "To create a budget: 1. Calculate your income 2. Track your expenses 3. Set financial goals 4. Create spending categories 5. Monitor and adjust regularly"
-        }
-        
-        for topic, guide in how_to_guides.items():
-            if topic in query:
+        for topic, guide in _HOW_TO.items():
+            if topic in matched_terms:
                 return guide
                 
         return self._get_content_based_response(content)
 
-    def _handle_explanation_question(self, query: str, content: list) -> str:
+    def _handle_explanation_question(self, matched_terms: Set[str], content: list) -> str:
         """Handle 'explain' type questions"""
-        explanations = {
-            "risk": "Risk in investing refers to the possibility of losing some or all of your investment. It's often measured by volatility - how much an investment's value changes over time.",
-            "diversification": "Diversification is a risk management strategy that involves spreading your investments across different assets to reduce exposure to any single asset or risk.",
-            "compound interest": "Compound interest is when you earn interest on both your initial investment and previously earned interest, leading to exponential growth over time."
-        }
-        
-        for topic, explanation in explanations.items():
-            if topic in query:
+        for topic, explanation in _EXPLANATIONS.items():
+            if topic in matched_terms:
                 return explanation
                 
         return self._get_content_based_response(content)
 
-    def _handle_comparison_question(self, query: str, content: list) -> str:
+    def _handle_comparison_question(self, matched_terms: Set[str], content: list) -> str:
         """Handle comparison questions"""
-        comparisons = {
-            "stocks bonds": "Stocks represent ownership in a company and typically offer higher potential returns with higher risk. Bonds are loans to companies or governments and typically offer lower, more stable returns with lower risk.",
-            "saving investing": "Saving typically involves putting money in a safe place with minimal risk and lower returns. Investing involves putting money into assets with the potential for higher returns but also higher risk.",
-            "bull bear": "A bull market is when stock prices are rising and market sentiment is optimistic. A bear market is when stock prices are falling and sentiment is pessimistic."
-        }
-        
-        for terms, comparison in comparisons.items():
-            if all(term in query for term in terms.split()):
+        for terms, comparison in _COMPARISONS.items():
+            if all(term in matched_terms for term in terms.split()):
                 return comparison
                 
         return self._get_content_based_response(content)
@@ -1,6 +1,7 @@
 from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Form, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 import logging
 from typing import Optional, Dict, List
 import json
@@ -17,7 +18,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from market_data import MarketDataService
 from ai_service import ai_service as ai_tutor_service
 from routes import chat, consultation
-from course_data import course_library
+from course_data import course_library, catalog_response
+from websocket_manager import websocket_manager
 
 market_service = MarketDataService()
 
@@ -28,7 +30,7 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Configure CORS
 app.add_middleware(
@@ -39,6 +41,21 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Compress larger JSON bodies such as the course catalog
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=5)
+
+@app.on_event("startup")
+async def start_websocket_broadcaster():
+    websocket_manager.start()
+
+@app.on_event("shutdown")
+async def stop_websocket_broadcaster():
+    await websocket_manager.stop()
+
+@app.on_event("shutdown")
+async def close_market_session():
+    await market_service.close()
+
 # Include routers
 app.include_router(chat.router, prefix="/api")
 app.include_router(consultation.router, prefix="/api")
@@ -84,32 +101,31 @@ async def generate_certificate(course_id: str, module_id: str):
     
     certificate_id = str(uuid.uuid4())
     
-    return JSONResponse(content={
+    return {
         "certificate_id": certificate_id,
         "course": course["title"],
         "module": module["title"],
         "date": datetime.now().isoformat()
-    })
+    }
 
 # New Course Endpoints
 @app.get("/courses")
-async def get_courses():
+async def get_courses(request: Request):
     """Get all available courses"""
     try:
-        courses = course_library.get_all_courses()
-        return JSONResponse(content=courses)
+        return catalog_response(request, course_library.get_all_courses_payload())
     except Exception as e:
         logger.error(f"Error fetching courses: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch courses")
 
 @app.get("/courses/{course_id}")
-async def get_course_details(course_id: str):
+async def get_course_details(course_id: str, request: Request):
     """Get detailed information about a specific course"""
     try:
-        course = course_library.get_course_details(course_id)
-        if not course:
+        cached = course_library.get_course_details_payload(course_id)
+        if not cached:
             raise HTTPException(status_code=404, detail="Course not found")
-        return JSONResponse(content=course)
+        return catalog_response(request, cached)
     except HTTPException:
         raise
     except Exception as e:
@@ -117,13 +133,13 @@ async def get_course_details(course_id: str):
         raise HTTPException(status_code=500, detail="Failed to fetch course details")
 
 @app.get("/courses/{course_id}/modules")
-async def get_course_modules(course_id: str):
+async def get_course_modules(course_id: str, request: Request):
     """Get all modules for a specific course"""
     try:
-        modules = course_library.get_course_modules(course_id)
-        if not modules:
+        cached = course_library.get_course_modules_payload(course_id)
+        if not cached:
             raise HTTPException(status_code=404, detail="Course modules not found")
-        return JSONResponse(content=modules)
+        return catalog_response(request, cached)
     except HTTPException:
         raise
     except Exception as e:
@@ -131,13 +147,13 @@ async def get_course_modules(course_id: str):
         raise HTTPException(status_code=500, detail="Failed to fetch course modules")
 
 @app.get("/courses/{course_id}/quizzes")
-async def get_course_quizzes(course_id: str):
+async def get_course_quizzes(course_id: str, request: Request):
     """Get all quizzes for a specific course"""
     try:
-        quizzes = course_library.get_course_quizzes(course_id)
-        if not quizzes:
+        cached = course_library.get_course_quizzes_payload(course_id)
+        if not cached:
             raise HTTPException(status_code=404, detail="Course quizzes not found")
-        return JSONResponse(content=quizzes)
+        return catalog_response(request, cached)
     except HTTPException:
         raise
     except Exception as e:
@@ -157,14 +173,14 @@ async def get_recommendations(user_id: str):
             "confidence": 0.9
         }
     ]
-    return JSONResponse(content=recommendations)
+    return recommendations
 
 # Market data routes
 @app.get("/market/data")
 async def get_market_data():
     try:
         market_data = await market_service.get_market_data()
-        return JSONResponse(content=market_data)
+        return market_data
     except Exception as e:
         logger.error(f"Error fetching market data: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch market data")
@@ -175,10 +191,14 @@ async def chat_with_tutor(request: Request):
     data = await request.json()
     user_message = data.get("message", "")
     context = data.get("context", "")
-    user_id = str(uuid.uuid4())  # Generate a unique user ID for this session
+    # Reuse the caller's id so the conversation and chat session carry over between turns
+    user_id = data.get("user_id") or request.headers.get("x-user-id")
+    if not user_id:
+        user_id = str(uuid.uuid4())
+        logger.info("No user_id in tutor request, using one-off id %s", user_id)
     
     # Use the AI tutor service to generate response
-    response = ai_tutor_service.generate_response(
+    response = await ai_tutor_service.generate_response(
         user_id=user_id,
         module_content=context,
         question=user_message
@@ -241,20 +261,24 @@ if __name__ == "__main__":
     import uvicorn
     import socket
     
-    def find_available_port(start_port, max_attempts=10):
+    def bind_available_port(start_port, max_attempts=10):
+        """Bind the first free port and keep the socket, so nothing can take it before uvicorn starts"""
         for port in range(start_port, start_port + max_attempts):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # Allow rebinding a port still in TIME_WAIT from a previous run
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             try:
-                with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                    s.bind(('0.0.0.0', port))
-                    return port
-            except socket.error:
-                continue
+                sock.bind(('0.0.0.0', port))
+                return sock
+            except OSError:
+                sock.close()
         raise RuntimeError(f"Could not find an available port after {max_attempts} attempts")
     
     try:
-        port = find_available_port(5000)
-        logger.info(f"Starting server on port {port}")
-        uvicorn.run(app, host="0.0.0.0", port=port)
+        sock = bind_available_port(int(os.getenv("PORT", "5000")))
+        logger.info(f"Starting server on port {sock.getsockname()[1]}")
+        server = uvicorn.Server(uvicorn.Config(app))
+        server.run(sockets=[sock])
     except Exception as e:
         logger.error(f"Failed to start server: {str(e)}")
         raise
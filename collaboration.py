@@ -1,14 +1,100 @@
 import os
+import hashlib
+import re
+import mmap
+import multiprocessing
+import queue
+import time
+import atexit
+import threading
 import fitz  # PyMuPDF for PDF handling
-import json
+import orjson
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Set, Tuple
 import logging
 from flask import jsonify
 import uuid
 
 logger = logging.getLogger(__name__)
 
+_TOKEN_RE = re.compile(r"\w+")
+
+# Plain text only; ligatures are left expanded so "fi"/"fl" words stay searchable
+PDF_TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+
+# Characters of surrounding text returned with each search match
+SEARCH_CONTEXT_CHARS = 100
+
+# PDFs with at least this many pages are extracted in parallel
+PARALLEL_EXTRACTION_MIN_PAGES = 64
+MAX_EXTRACTION_WORKERS = min(8, os.cpu_count() or 1)
+
+# A page slower than this to extract switches the rest of the range to single-page copies
+SLOW_PAGE_SECONDS = 0.5
+
+def _isolated_page_text(doc, number: int) -> str:
+    """Extract one page from a throwaway single-page copy of it"""
+    with fitz.open() as single:
+        single.insert_pdf(doc, from_page=number, to_page=number, annots=False, links=False)
+        return single[0].get_text("text", flags=PDF_TEXT_FLAGS, sort=False)
+
+def _page_range_text(doc, start: int, stop: int) -> str:
+    parts = []
+    isolate = False
+    for number in range(start, stop):
+        if isolate:
+            parts.append(_isolated_page_text(doc, number))
+            continue
+        started = time.perf_counter()
+        parts.append(doc[number].get_text("text", flags=PDF_TEXT_FLAGS, sort=False))
+        # Some PDFs make every page slow because of document-wide structure such as a huge
+        # structure tree; the same page copied into a fresh PDF extracts in milliseconds
+        if time.perf_counter() - started > SLOW_PAGE_SECONDS:
+            isolate = True
+    return "".join(parts)
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> str:
+    """Extract the text of pages [start, stop) with a document handle of its own"""
+    with fitz.open(file_path) as doc:
+        return _page_range_text(doc, start, stop)
+
+# The worker processes are started on first use and kept for later uploads. They are
+# spawned, not forked: this process runs other threads, and a forked child could inherit
+# a lock one of them held at the time
+@lru_cache(maxsize=None)
+def _extraction_pool() -> ProcessPoolExecutor:
+    pool = ProcessPoolExecutor(
+        max_workers=max(1, MAX_EXTRACTION_WORKERS - 1),
+        mp_context=multiprocessing.get_context("spawn")
+    )
+    atexit.register(pool.shutdown, wait=False, cancel_futures=True)
+    return pool
+
+def extract_pdf_text(file_path: str, content: bytes = None) -> str:
+    """Extract a PDF's text, splitting large documents into page ranges across worker processes
+
+    If the file's bytes are already in memory they are parsed directly rather than read back from disk.
+    """
+    # The handle is closed even if extraction fails part way
+    with (fitz.open(stream=content, filetype="pdf") if content is not None else fitz.open(file_path)) as doc:
+        page_count = doc.page_count
+        if page_count < PARALLEL_EXTRACTION_MIN_PAGES or MAX_EXTRACTION_WORKERS < 2:
+            return _page_range_text(doc, 0, page_count)
+
+        # MuPDF holds the GIL and its documents can't be shared between threads, so each
+        # worker process opens the file itself and handles one contiguous range of pages;
+        # the first range is done here on the handle that is already open
+        step = -(-page_count // MAX_EXTRACTION_WORKERS)
+        starts = list(range(step, page_count, step))
+        stops = [min(start + step, page_count) for start in starts]
+        rest = _extraction_pool().map(_extract_page_range, [file_path] * len(starts), starts, stops)
+        first = _page_range_text(doc, 0, step)
+        return first + "".join(rest)
+
 class CollaborationManager:
     def __init__(self):
         self.upload_dir = os.path.join(os.path.dirname(__file__), "uploads")
@@ -16,56 +102,286 @@ class CollaborationManager:
         self.resources_dir = os.path.join(self.upload_dir, "resources")
         
         # Create directories if they don't exist
-        for directory in [self.upload_dir, self.notes_dir, self.resources_dir]:
-            if not os.path.exists(directory):
-                os.makedirs(directory)
+        for directory in (self.upload_dir, self.notes_dir, self.resources_dir):
+            os.makedirs(directory, exist_ok=True)
                 
         # Initialize data stores
-        self.notes_db_path = os.path.join(self.upload_dir, "notes.json")
-        self.resources_db_path = os.path.join(self.upload_dir, "resources.json")
+        # Notes and resources are append-only JSON Lines logs, study groups a single JSON document
+        self.notes_db_path = os.path.join(self.upload_dir, "notes.jsonl")
+        self.resources_db_path = os.path.join(self.upload_dir, "resources.jsonl")
         self.study_groups_db_path = os.path.join(self.upload_dir, "study_groups.json")
+        self.counters_db_path = os.path.join(self.upload_dir, "counters.json")
         
         self._load_data()
+
+        self._notes_fp = open(self.notes_db_path, 'ab', buffering=1 << 16)
+        self._resources_fp = open(self.resources_db_path, 'ab', buffering=1 << 16)
+        # Writes are handed to one background thread so requests never wait on the disk
+        self._write_queue = queue.Queue()
+        self._writer = threading.Thread(target=self._writer_loop, name="collaboration-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
         
     def _load_data(self):
         """Load data from JSON files"""
-        self.notes = self._load_json(self.notes_db_path, [])
-        self.resources = self._load_json(self.resources_db_path, [])
+        self.notes = self._load_jsonl(self.notes_db_path)
+        self.resources = self._load_jsonl(self.resources_db_path)
+
+        # token -> positions in self.resources of the PDFs containing it
+        self.text_index: Dict[str, Set[int]] = defaultdict(set)
+        # content hash -> first resource holding that PDF, so re-uploads share its file and text
+        self._resources_by_hash: Dict[str, Dict] = {}
+        migrated, migration_failed = False, False
+        for position, resource in enumerate(self.resources):
+            if "text_content" in resource:
+                # Older records carry their text inline; move it out to a sidecar file
+                text_content = resource.pop("text_content")
+                resource.pop("text_content_lower", None)
+                try:
+                    text_path = resource["file_path"] + ".txt"
+                    if not os.path.exists(text_path):
+                        self._write_text_sidecar(resource["file_path"], text_content)
+                    resource["text_path"] = text_path
+                    migrated = True
+                except Exception as e:
+                    migration_failed = True
+                    logger.error("Error moving text of %s to a sidecar: %s", resource["file_path"], e)
+            self._index_resource(position, self._read_text_sidecar(resource))
+            if resource.get("content_hash") and resource.get("text_path"):
+                self._resources_by_hash.setdefault(resource["content_hash"], resource)
+
+        # Drop the moved text from the log too, so later startups don't parse it again
+        if migrated and not migration_failed:
+            self._rewrite_jsonl(self.resources_db_path, self.resources)
+
         self.study_groups = self._load_json(self.study_groups_db_path, {})
+
+        # Reverse indexes so per-user reads don't scan every note and group
+        # (user_id, course_id) -> notes; (user_id, None) holds all of the user's notes
+        self._notes_by_user_course: Dict[Tuple[str, Optional[str]], List[Dict]] = defaultdict(list)
+        for note in self.notes:
+            self._index_note(note)
+        # user -> ids of the groups they belong to, in the order they joined (dict as an ordered set)
+        self._groups_by_user: Dict[str, Dict[str, None]] = defaultdict(dict)
+        for group_id, group in self.study_groups.items():
+            self._index_group_members(group_id, group)
+
+        # Last id handed out per record kind; seeded from existing data the first time
+        self._counters = self._load_json(self.counters_db_path, None)
+        if self._counters is None:
+            self._counters = {
+                "note": max((n["id"] for n in self.notes if isinstance(n["id"], int)), default=0),
+                "resource": max((r["id"] for r in self.resources if isinstance(r["id"], int)), default=0),
+                "group": max((int(gid) for gid in self.study_groups if gid.isdigit()), default=0)
+            }
+
+    def _next_id(self, kind: str) -> int:
+        """Hand out the next id for a record kind and persist the counter"""
+        self._counters[kind] += 1
+        self._queue_save(self.counters_db_path, self._counters)
+        return self._counters[kind]
+
+    def _index_note(self, note: Dict):
+        self._notes_by_user_course[(note["user_id"], None)].append(note)
+        if note["course_id"]:
+            self._notes_by_user_course[(note["user_id"], note["course_id"])].append(note)
+
+    def _index_group_members(self, group_id: str, group: Dict):
+        for member in group.get("members", []):
+            # create_group stores members as profile dicts, which never matched a user id lookup
+            if isinstance(member, str):
+                self._groups_by_user[member][group_id] = None
+
+    def _write_text_sidecar(self, file_path: str, text_content: str) -> str:
+        """Store a PDF's lower-cased text next to it, where searches memory-map it"""
+        text_path = file_path + ".txt"
+        with open(text_path, 'wb') as f:
+            f.write(text_content.lower().encode())
+        return text_path
+
+    def _read_text_sidecar(self, resource: Dict) -> str:
+        text_path = resource.get("text_path")
+        if not text_path:
+            return ""
+        try:
+            with open(text_path, 'rb') as f:
+                return f.read().decode()
+        except Exception as e:
+            logger.error("Error reading %s: %s", text_path, e)
+            return ""
+
+    def _index_resource(self, position: int, text_content: str):
+        for token in set(_TOKEN_RE.findall(text_content)):
+            self.text_index[token].add(position)
+
+    def _find_context(self, text_path: str, query: str) -> Optional[str]:
+        """Return the text around the first match of the (lower-cased) query, or None"""
+        query_bytes = query.encode()
+        with open(text_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                match = mm.find(query_bytes)
+                if match == -1:
+                    return None
+                # Only decode a window wide enough for the context: a character is at most 4 UTF-8 bytes
+                margin = 4 * (SEARCH_CONTEXT_CHARS + 1)
+                window_start = max(0, match - margin)
+                window = mm[window_start:match + len(query_bytes) + margin].decode('utf-8', errors='ignore')
+
+        start_idx = window.find(query)
+        context_start = max(0, start_idx - SEARCH_CONTEXT_CHARS)
+        return window[context_start:start_idx + len(query) + SEARCH_CONTEXT_CHARS]
+
+    def _search_candidates(self, query: str) -> List[int]:
+        """Positions of resources that can contain the (lower-cased) query"""
+        # Only words with a boundary on both sides inside the query must appear whole in the
+        # text; the first and last word may be cut off, so those can't be looked up
+        postings = [
+            self.text_index.get(match.group(), set())
+            for match in _TOKEN_RE.finditer(query)
+            if match.start() > 0 and match.end() < len(query)
+        ]
+        if not postings:
+            return list(range(len(self.resources)))
+        return sorted(set.intersection(*postings))
+
+    def _load_jsonl(self, path: str) -> List[Dict]:
+        """Load a JSON Lines log, migrating the old whole-file JSON list if that is all there is"""
+        legacy_path = os.path.splitext(path)[0] + ".json"
+        if not os.path.exists(path) and os.path.exists(legacy_path):
+            records = self._load_json(legacy_path, [])
+            try:
+                with open(path, 'wb') as f:
+                    for record in records:
+                        f.write(orjson.dumps(record) + b'\n')
+            except Exception as e:
+                logger.error("Error migrating %s: %s", legacy_path, e)
+            return records
+
+        records = []
+        try:
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    for line in f:
+                        if line.strip():
+                            records.append(orjson.loads(line))
+        except Exception as e:
+            logger.error("Error loading %s: %s", path, e)
+        return records
         
+    def _rewrite_jsonl(self, path: str, records: List[Dict]):
+        """Atomically replace a JSON Lines log with the given records"""
+        try:
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(b''.join(orjson.dumps(record) + b'\n' for record in records))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error("Error rewriting %s: %s", path, e)
+
     def _load_json(self, path: str, default: any) -> any:
         """Load JSON file or return default if file doesn't exist"""
         try:
             if os.path.exists(path):
-                with open(path, 'r') as f:
-                    return json.load(f)
+                with open(path, 'rb') as f:
+                    return orjson.loads(f.read())
         except Exception as e:
-            logger.error(f"Error loading {path}: {str(e)}")
+            logger.error("Error loading %s: %s", path, e)
         return default
         
     def _save_json(self, path: str, data: any):
         """Save data to JSON file"""
         try:
-            with open(path, 'w') as f:
-                json.dump(data, f, indent=2)
+            # Serialise up front so the file gets a single unbuffered write, then swap it in
+            # atomically so a crash mid-save never leaves a truncated file behind
+            payload = orjson.dumps(data)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb', buffering=0) as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error("Error saving to %s: %s", path, e)
+
+    def _append_record(self, fp, record: Dict):
+        """Append one record to a JSON Lines log"""
+        try:
+            fp.write(orjson.dumps(record) + b'\n')
         except Exception as e:
-            logger.error(f"Error saving to {path}: {str(e)}")
+            logger.error("Error appending to %s: %s", fp.name, e)
+
+    def _queue_append(self, fp, record: Dict):
+        self._write_queue.put(("append", fp, record))
+
+    def _queue_save(self, path: str, data: any):
+        # The live object is queued, not a copy: the writer serialises whatever is current,
+        # and orjson holds the GIL while dumping so it always sees a consistent state
+        self._write_queue.put(("save", path, data))
+
+    def _mark_study_groups_dirty(self):
+        """Queue a rewrite of study_groups.json"""
+        self._queue_save(self.study_groups_db_path, self.study_groups)
+
+    def _writer_loop(self):
+        """Apply queued writes in batches, saving each whole file at most once per batch"""
+        while True:
+            batch = [self._write_queue.get()]
+            while True:
+                try:
+                    batch.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            saves = {}
+            appended = set()
+            stop = False
+            for op, target, data in batch:
+                if op == "append":
+                    self._append_record(target, data)
+                    appended.add(target)
+                elif op == "save":
+                    saves[target] = data
+                else:
+                    stop = True
+
+            for fp in appended:
+                try:
+                    fp.flush()
+                except Exception as e:
+                    logger.error("Error flushing %s: %s", fp.name, e)
+            for path, data in saves.items():
+                self._save_json(path, data)
+            if stop:
+                return
+
+    def close(self):
+        """Drain pending writes and close the append logs"""
+        if self._writer.is_alive():
+            self._write_queue.put(("stop", None, None))
+            self._writer.join()
+        for fp in (self._notes_fp, self._resources_fp):
+            if not fp.closed:
+                fp.flush()
+                os.fsync(fp.fileno())
+                fp.close()
 
     def save_note(self, title: str, content: str, user_id: str, course_id: str = None) -> Dict:
         """Save a new note"""
         try:
+            now = datetime.now().isoformat()
             note = {
-                "id": len(self.notes) + 1,
+                "id": self._next_id("note"),
                 "title": title,
                 "content": content,
                 "user_id": user_id,
                 "course_id": course_id,
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
+                "created_at": now,
+                "updated_at": now
             }
             
             self.notes.append(note)
-            self._save_json(self.notes_db_path, self.notes)
+            self._index_note(note)
+            self._queue_append(self._notes_fp, note)
             
             return {
                 "success": True,
@@ -73,7 +389,7 @@ class CollaborationManager:
             }
             
         except Exception as e:
-            logger.error(f"Error saving note: {str(e)}")
+            logger.error("Error saving note: %s", e)
             return {
                 "success": False,
                 "error": str(e)
@@ -82,46 +398,55 @@ class CollaborationManager:
     def get_notes(self, user_id: str, course_id: str = None) -> List[Dict]:
         """Get notes for a user and optionally filtered by course"""
         try:
-            user_notes = [n for n in self.notes if n["user_id"] == user_id]
-            if course_id:
-                user_notes = [n for n in user_notes if n["course_id"] == course_id]
-            return user_notes
+            return list(self._notes_by_user_course.get((user_id, course_id or None), ()))
         except Exception as e:
-            logger.error(f"Error getting notes: {str(e)}")
+            logger.error("Error getting notes: %s", e)
             return []
 
     def save_pdf(self, content: bytes, filename: str, user_id: str) -> Dict:
         """Save an uploaded PDF file"""
         try:
-            # Generate unique filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            safe_filename = f"{user_id}_{timestamp}_{filename}"
-            file_path = os.path.join(self.resources_dir, safe_filename)
-            
-            # Save file
-            with open(file_path, 'wb') as f:
-                f.write(content)
-                
-            # Extract text for searching
-            doc = fitz.open(file_path)
-            text_content = ""
-            for page in doc:
-                text_content += page.get_text()
-            doc.close()
+            now = datetime.now()
+            content_hash = hashlib.blake2b(content, digest_size=16).hexdigest()
+            existing = self._resources_by_hash.get(content_hash)
+
+            if existing:
+                # Same PDF as an earlier upload: point at its file and text instead of extracting again
+                safe_filename = existing["filename"]
+                file_path = existing["file_path"]
+                text_path = existing["text_path"]
+                text_content_lower = self._read_text_sidecar(existing)
+            else:
+                # Generate unique filename
+                timestamp = now.strftime("%Y%m%d_%H%M%S")
+                safe_filename = f"{user_id}_{timestamp}_{filename}"
+                file_path = os.path.join(self.resources_dir, safe_filename)
+
+                # Save file
+                with open(file_path, 'wb') as f:
+                    f.write(content)
+
+                # Extract text for searching, lower-cased once here so searches only lower-case the query
+                text_content = extract_pdf_text(file_path, content)
+                text_path = self._write_text_sidecar(file_path, text_content)
+                text_content_lower = text_content.lower()
             
             # Save resource metadata
             resource = {
-                "id": len(self.resources) + 1,
+                "id": self._next_id("resource"),
                 "filename": safe_filename,
                 "original_filename": filename,
                 "user_id": user_id,
                 "file_path": file_path,
-                "text_content": text_content,
-                "uploaded_at": datetime.now().isoformat()
+                "text_path": text_path,
+                "content_hash": content_hash,
+                "uploaded_at": now.isoformat()
             }
             
             self.resources.append(resource)
-            self._save_json(self.resources_db_path, self.resources)
+            self._resources_by_hash.setdefault(content_hash, resource)
+            self._index_resource(len(self.resources) - 1, text_content_lower)
+            self._queue_append(self._resources_fp, resource)
             
             return {
                 "success": True,
@@ -133,7 +458,7 @@ class CollaborationManager:
             }
             
         except Exception as e:
-            logger.error(f"Error saving PDF: {str(e)}")
+            logger.error("Error saving PDF: %s", e)
             return {
                 "success": False,
                 "error": str(e)
@@ -145,15 +470,12 @@ class CollaborationManager:
             results = []
             query = query.lower()
             
-            for resource in self.resources:
-                text_content = resource["text_content"].lower()
-                if query in text_content:
-                    # Find the context around the match
-                    start_idx = text_content.find(query)
-                    context_start = max(0, start_idx - 100)
-                    context_end = min(len(text_content), start_idx + len(query) + 100)
-                    context = text_content[context_start:context_end]
-                    
+            for position in self._search_candidates(query):
+                resource = self.resources[position]
+                if not resource.get("text_path"):
+                    continue
+                context = self._find_context(resource["text_path"], query)
+                if context is not None:
                     results.append({
                         "id": resource["id"],
                         "filename": resource["original_filename"],
@@ -164,13 +486,13 @@ class CollaborationManager:
             return results
             
         except Exception as e:
-            logger.error(f"Error searching PDFs: {str(e)}")
+            logger.error("Error searching PDFs: %s", e)
             return []
 
     def create_study_group(self, name: str, description: str, course_id: str, created_by: str) -> Dict:
         """Create a new study group"""
         try:
-            group_id = str(len(self.study_groups) + 1)
+            group_id = str(self._next_id("group"))
             group = {
                 "id": group_id,
                 "name": name,
@@ -184,7 +506,8 @@ class CollaborationManager:
             }
             
             self.study_groups[group_id] = group
-            self._save_json(self.study_groups_db_path, self.study_groups)
+            self._index_group_members(group_id, group)
+            self._mark_study_groups_dirty()
             
             return {
                 "success": True,
@@ -192,7 +515,7 @@ class CollaborationManager:
             }
             
         except Exception as e:
-            logger.error(f"Error creating study group: {str(e)}")
+            logger.error("Error creating study group: %s", e)
             return {
                 "success": False,
                 "error": str(e)
@@ -207,9 +530,11 @@ class CollaborationManager:
                     "error": "Study group not found"
                 }
                 
-            if user_id not in self.study_groups[group_id]["members"]:
+            # The reverse index answers membership in O(1) without scanning the members list
+            if group_id not in self._groups_by_user.get(user_id, ()):
                 self.study_groups[group_id]["members"].append(user_id)
-                self._save_json(self.study_groups_db_path, self.study_groups)
+                self._groups_by_user[user_id][group_id] = None
+                self._mark_study_groups_dirty()
                 
             return {
                 "success": True,
@@ -217,7 +542,7 @@ class CollaborationManager:
             }
             
         except Exception as e:
-            logger.error(f"Error joining study group: {str(e)}")
+            logger.error("Error joining study group: %s", e)
             return {
                 "success": False,
                 "error": str(e)
@@ -226,10 +551,10 @@ class CollaborationManager:
     def get_study_groups(self, user_id: str = None, course_id: str = None) -> List[Dict]:
         """Get study groups, optionally filtered by user or course"""
         try:
-            groups = list(self.study_groups.values())
-            
             if user_id:
-                groups = [g for g in groups if user_id in g["members"]]
+                groups = [self.study_groups[gid] for gid in self._groups_by_user.get(user_id, ())]
+            else:
+                groups = list(self.study_groups.values())
                 
             if course_id:
                 groups = [g for g in groups if g["course_id"] == course_id]
@@ -237,12 +562,13 @@ class CollaborationManager:
             return groups
             
         except Exception as e:
-            logger.error(f"Error getting study groups: {str(e)}")
+            logger.error("Error getting study groups: %s", e)
             return []
 
-    def get_student_groups(self):
-        """Get all student groups"""
-        return {'groups': list(self.study_groups.values())}
+    def get_student_groups(self, offset: int = 0, limit: Optional[int] = None):
+        """Get student groups, optionally a page of `limit` groups starting at `offset`"""
+        stop = None if limit is None else offset + limit
+        return {'groups': list(islice(self.study_groups.values(), offset, stop))}
 
     def get_group_by_id(self, group_id):
         """Get a specific student group by ID"""
@@ -261,7 +587,7 @@ class CollaborationManager:
             'discussions': []
         }
         self.study_groups[group_id] = new_group
-        self._save_json(self.study_groups_db_path, self.study_groups)
+        self._mark_study_groups_dirty()
         return new_group
 
     def add_group_discussion(self, group_id, data):
@@ -275,13 +601,15 @@ class CollaborationManager:
                 'author': data['author']
             }
             self.study_groups[group_id]['discussions'].append(discussion)
-            self._save_json(self.study_groups_db_path, self.study_groups)
+            self._mark_study_groups_dirty()
             return discussion
         return None
 
-    def get_resources(self):
-        """Get all uploaded resources"""
-        return {'resources': self.resources}
+    def get_resources(self, offset: int = 0, limit: Optional[int] = None):
+        """Get uploaded resources, optionally a page of `limit` resources starting at `offset`"""
+        stop = None if limit is None else offset + limit
+        # A slice, so callers can't modify the manager's own list
+        return {'resources': self.resources[offset:stop]}
 
     def add_resource(self, data):
         """Add a new resource"""
@@ -297,8 +625,16 @@ class CollaborationManager:
             'tags': data['tags']
         }
         self.resources.append(new_resource)
-        self._save_json(self.resources_db_path, self.resources)
+        self._queue_append(self._resources_fp, new_resource)
         return new_resource
 
-# Initialize collaboration manager
-collaboration_manager = CollaborationManager()
+# Created on first use so importing this module doesn't read the data files
+@lru_cache(maxsize=None)
+def get_collaboration_manager() -> CollaborationManager:
+    return CollaborationManager()
+
+def __getattr__(name):
+    # Keep `from collaboration import collaboration_manager` working
+    if name == "collaboration_manager":
+        return get_collaboration_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
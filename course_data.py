@@ -1,23 +1,57 @@
-from typing import Dict, List, Optional
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import FastAPI, HTTPException, Request, Response
+from pydantic import BaseModel, ConfigDict
+import hashlib
 import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+import orjson
+
+from course_catalog import COURSES
 
 logger = logging.getLogger(__name__)
 
+# Users whose progress is kept in memory; the rest is read back from the progress store on demand
+MAX_CACHED_PROGRESS_USERS = 10000
+# Progress updates are serialised per user through one of this many locks
+PROGRESS_LOCK_STRIPES = 64
+# Fields of a course included in listings; lessons and quizzes only come with the single course
+COURSE_SUMMARY_FIELDS = ("id", "title", "description", "level", "image", "duration")
+# Quizzes with at least this many questions are graded with one NumPy comparison
+VECTORIZED_GRADING_MIN_QUESTIONS = 64
+# Share of questions, in percent, a student must answer correctly to pass a quiz
+PASS_PERCENT = 70
+# The catalog only changes with a deploy, so clients and proxies may reuse it for a day
+CATALOG_CACHE_HEADERS = {"Cache-Control": "public, max-age=86400"}
+PROGRESS_DB_PATH = os.getenv("PROGRESS_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "user_progress.db"))
+# Shared 404s for catalog lookups; raised with with_traceback(None) so the traceback
+# of one miss doesn't pile up on the next
+_COURSE_NOT_FOUND = HTTPException(status_code=404, detail="Course not found")
+_MODULE_NOT_FOUND = HTTPException(status_code=404, detail="Module not found")
+
+# The catalog is read-only, and so are the models describing it
 class Question(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     id: str
     question: str
     options: List[str]
     correct_answer: int
 
 class Quiz(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     id: str
     title: str
     questions: List[Question]
     time_limit: int  # in minutes
 
 class Lesson(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     id: str
     title: str
     content: str
@@ -25,12 +59,16 @@ class Lesson(BaseModel):
     video_url: Optional[str] = None
 
 class Module(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     id: str
     title: str
     lessons: List[Lesson]
     quiz: Quiz
 
 class Course(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     id: str
     title: str
     description: str
@@ -39,545 +77,277 @@ class Course(BaseModel):
     modules: List[Module]
     duration: str
 
+# Progress of a course the user hasn't passed a quiz in yet; copied per user and course
+PROGRESS_DEFAULT = MappingProxyType({
+    "completed": False,
+    "score": 0,
+    "passed": False
+})
+
+def json_default(value: Any) -> Any:
+    """orjson `default` hook for the frozen catalog"""
+    if isinstance(value, MappingProxyType):
+        return dict(value)
+    raise TypeError
+
+def _encode(value: Any) -> Tuple[bytes, str]:
+    """Encode part of the catalog and derive its ETag from the bytes"""
+    payload = orjson.dumps(value, default=json_default)
+    return payload, f'"{hashlib.blake2b(payload, digest_size=16).hexdigest()}"'
+
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    """If-None-Match uses weak comparison, so W/ prefixes (added by proxies that compress
+    the body) are ignored, and * matches any current representation"""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+def catalog_response(request: Request, encoded: Tuple[bytes, str]) -> Response:
+    """Serve encoded catalog JSON, or 304 Not Modified if the client already has these bytes"""
+    payload, etag = encoded
+    headers = {**CATALOG_CACHE_HEADERS, "ETag": etag}
+    if _etag_matches(etag, request.headers.get("if-none-match", "")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
+
 class CourseLibrary:
     def __init__(self):
-        self.courses = {
-            "fin101": {
-                "id": "fin101",
-                "title": "Introduction to Financial Markets",
-                "description": "Learn the fundamentals of financial markets, including stocks, bonds, and market analysis",
-                "level": "Beginner",
-                "image": "https://example.com/fin101.jpg",
-                "duration": "4 weeks",
-                "modules": [
-                    {
-                        "id": "fin101-m1",
-                        "title": "Understanding Stock Markets",
-                        "lessons": [
-                            {
-                                "id": "fin101-l1",
-                                "title": "What are Stocks?",
-                                "content": """
-                                In this lesson, you'll learn:
-                                - Definition of stocks and shares
-                                - How stock markets work
-                                - Types of stock exchanges
-                                - Reading stock quotes
-                                - Understanding market indices
-                                """,
-                                "duration": "30 mins",
-                                "video_url": "https://example.com/stocks-intro.mp4"
-                            },
-                            {
-                                "id": "fin101-l2",
-                                "title": "Stock Market Analysis",
-                                "content": """
-                                Learn about:
-                                - Fundamental analysis
-                                - Technical analysis
-                                - Market indicators
-                                - Trading volumes
-                                - Price patterns
-                                """,
-                                "duration": "45 mins",
-                                "video_url": "https://example.com/market-analysis.mp4"
-                            }
-                        ],
-                        "quiz": {
-                            "id": "fin101-q1",
-                            "title": "Stock Market Basics Quiz",
-                            "time_limit": 15,
-                            "questions": [
-                                {
-                                    "id": "q1",
-                                    "question": "What does a bull market indicate?",
-                                    "options": [
-                                        "Falling stock prices",
-                                        "Rising stock prices",
-                                        "Stable stock prices",
-                                        "Market closure"
-                                    ],
-                                    "correct_answer": 1
-                                },
-                                {
-                                    "id": "q2",
-                                    "question": "Which of these is a major stock index?",
-                                    "options": [
-                                        "NASDAQ",
-                                        "LIBOR",
-                                        "SWIFT",
-                                        "IBAN"
-                                    ],
-                                    "correct_answer": 0
-                                }
-                            ]
-                        }
-                    }
-                ]
-            },
-            "fin201": {
-                "id": "fin201",
-                "title": "Investment Strategies",
-                "description": "Master various investment strategies and portfolio management techniques",
-                "level": "Intermediate",
-                "image": "https://example.com/fin201.jpg",
-                "duration": "6 weeks",
-                "modules": [
-                    {
-                        "id": "fin201-m1",
-                        "title": "Portfolio Management",
-                        "lessons": [
-                            {
-                                "id": "fin201-l1",
-                                "title": "Portfolio Diversification",
-                                "content": """
-                                Learn about:
-                                - Risk management
-                                - Asset allocation
-                                - Diversification strategies
-                                - Portfolio rebalancing
-                                - Risk-return tradeoff
-                                """,
-                                "duration": "40 mins",
-                                "video_url": "https://example.com/portfolio-div.mp4"
-                            },
-                            {
-                                "id": "fin201-l2",
-                                "title": "Investment Vehicles",
-                                "content": """
-                                Explore different investment options:
-                                - Mutual funds
-                                - ETFs
-                                - Bonds
-                                - Real estate
-                                - Commodities
-                                """,
-                                "duration": "35 mins",
-                                "video_url": "https://example.com/investment-vehicles.mp4"
-                            }
-                        ],
-                        "quiz": {
-                            "id": "fin201-q1",
-                            "title": "Portfolio Management Quiz",
-                            "time_limit": 15,
-                            "questions": [
-                                {
-                                    "id": "q1",
-                                    "question": "What is the main benefit of diversification?",
-                                    "options": [
-                                        "Guaranteed returns",
-                                        "Risk reduction",
-                                        "Tax benefits",
-                                        "Higher returns"
-                                    ],
-                                    "correct_answer": 1
-                                },
-                                {
-                                    "id": "q2",
-                                    "question": "Which investment typically has the highest risk?",
-                                    "options": [
-                                        "Government bonds",
-                                        "Blue-chip stocks",
-                                        "Penny stocks",
-                                        "Money market funds"
-                                    ],
-                                    "correct_answer": 2
-                                }
-                            ]
-                        }
-                    }
-                ]
-            },
-            "python": {
-                "id": "python-101",
-                "title": "Python Programming Fundamentals",
-                "description": "Learn Python programming from basics to advanced concepts",
-                "level": "Beginner",
-                "image": "https://upload.wikimedia.org/wikipedia/commons/c/c3/Python-logo-notext.svg",
-                "duration": "4 weeks",
-                "modules": [
-                    {
-                        "id": "py-mod-1",
-                        "title": "Introduction to Python",
-                        "lessons": [
-                            {
-                                "id": "py-les-1",
-                                "title": "Getting Started with Python",
-                                "content": "Python is a high-level, interpreted programming language...",
-                                "duration": "15 mins",
-                                "video_url": None
-                            },
-                            {
-                                "id": "py-les-2",
-                                "title": "Variables and Data Types",
-                                "content": "Learn about Python's basic data types: int, float, str, bool...",
-                                "duration": "20 mins",
-                                "video_url": None
-                            }
-                        ],
-                        "quiz": {
-                            "id": "py-quiz-1",
-                            "title": "Python Basics Quiz",
-                            "time_limit": 15,
-                            "questions": [
-                                {
-                                    "id": "q1",
-                                    "question": "What is the output of print(type(5.0))?",
-                                    "options": [
-                                        "<class 'int'>",
-                                        "<class 'float'>",
-                                        "<class 'str'>",
-                                        "<class 'number'>"
-                                    ],
-                                    "correct_answer": 1
-                                },
-                                {
-                                    "id": "q2",
-                                    "question": "Which of these is a valid variable name in Python?",
-                                    "options": [
-                                        "2variable",
-                                        "_variable",
-                                        "variable-name",
-                                        "variable name"
-                                    ],
-                                    "correct_answer": 1
-                                }
-                            ]
-                        }
-                    },
-                    {
-                        "id": "py-mod-2",
-                        "title": "Control Flow",
-                        "lessons": [
-                            {
-                                "id": "py-les-3",
-                                "title": "Conditional Statements",
-                                "content": "Learn about if, elif, and else statements in Python...",
-                                "duration": "25 mins",
-                                "video_url": None
-                            },
-                            {
-                                "id": "py-les-4",
-                                "title": "Loops in Python",
-                                "content": "Understanding for and while loops...",
-                                "duration": "30 mins",
-                                "video_url": None
-                            }
-                        ],
-                        "quiz": {
-                            "id": "py-quiz-2",
-                            "title": "Python Control Flow Quiz",
-                            "time_limit": 15,
-                            "questions": [
-                                {
-                                    "id": "q1",
-                                    "question": "What is the purpose of the break statement in Python?",
-                                    "options": [
-                                        "To exit a loop",
-                                        "To skip a loop iteration",
-                                        "To continue a loop",
-                                        "To start a loop"
-                                    ],
-                                    "correct_answer": 0
-                                },
-                                {
-                                    "id": "q2",
-                                    "question": "What is the difference between for and while loops?",
-                                    "options": [
-                                        "For loops are used for arrays, while loops are used for linked lists",
-                                        "For loops are used for iteration, while loops are used for recursion",
-                                        "For loops are used for iteration, while loops are used for conditional execution",
-                                        "For loops are used for conditional execution, while loops are used for iteration"
-                                    ],
-                                    "correct_answer": 2
-                                }
-                            ]
-                        }
-                    }
-                ]
-            },
-            "javascript": {
-                "id": "js-101",
-                "title": "JavaScript Essentials",
-                "description": "Master modern JavaScript programming",
-                "level": "Beginner",
-                "image": "https://upload.wikimedia.org/wikipedia/commons/6/6a/JavaScript-logo.png",
-                "duration": "4 weeks",
-                "modules": [
-                    {
-                        "id": "js-mod-1",
-                        "title": "JavaScript Basics",
-                        "lessons": [
-                            {
-                                "id": "js-les-1",
-                                "title": "Introduction to JavaScript",
-                                "content": "JavaScript is a dynamic programming language...",
-                                "duration": "20 mins",
-                                "video_url": None
-                            },
-                            {
-                                "id": "js-les-2",
-                                "title": "Variables and Data Types",
-                                "content": "Understanding var, let, const, and JavaScript data types...",
-                                "duration": "25 mins",
-                                "video_url": None
-                            }
-                        ],
-                        "quiz": {
-                            "id": "js-quiz-1",
-                            "title": "JavaScript Basics Quiz",
-                            "time_limit": 15,
-                            "questions": [
-                                {
-                                    "id": "q1",
-                                    "question": "Which keyword is used to declare a constant in JavaScript?",
-                                    "options": [
-                                        "var",
-                                        "let",
-                                        "const",
-                                        "final"
-                                    ],
-                                    "correct_answer": 2
-                                },
-                                {
-                                    "id": "q2",
-                                    "question": "What is the output of typeof []?",
-                                    "options": [
-                                        "array",
-                                        "object",
-                                        "list",
-                                        "undefined"
-                                    ],
-                                    "correct_answer": 1
-                                }
-                            ]
-                        }
-                    },
-                    {
-                        "id": "js-mod-2",
-                        "title": "Functions and Objects",
-                        "lessons": [
-                            {
-                                "id": "js-les-3",
-                                "title": "JavaScript Functions",
-                                "content": "Learn about function declarations, expressions, and arrow functions...",
-                                "duration": "30 mins",
-                                "video_url": None
-                            },
-                            {
-                                "id": "js-les-4",
-                                "title": "Working with Objects",
-                                "content": "Understanding JavaScript objects and prototypes...",
-                                "duration": "35 mins",
-                                "video_url": None
-                            }
-                        ],
-                        "quiz": {
-                            "id": "js-quiz-2",
-                            "title": "JavaScript Functions and Objects Quiz",
-                            "time_limit": 15,
-                            "questions": [
-                                {
-                                    "id": "q1",
-                                    "question": "What is the purpose of the this keyword in JavaScript?",
-                                    "options": [
-                                        "To refer to the global object",
-                                        "To refer to the current object",
-                                        "To refer to the parent object",
-                                        "To refer to the child object"
-                                    ],
-                                    "correct_answer": 1
-                                },
-                                {
-                                    "id": "q2",
-                                    "question": "What is the difference between null and undefined in JavaScript?",
-                                    "options": [
-                                        "Null is a primitive value, undefined is an object",
-                                        "Null is an object, undefined is a primitive value",
-                                        "Null is a primitive value, undefined is a type",
-                                        "Null is a type, undefined is a primitive value"
-                                    ],
-                                    "correct_answer": 0
-                                }
-                            ]
-                        }
-                    }
-                ]
-            },
-            "react": {
-                "id": "react-101",
-                "title": "React Development",
-                "description": "Learn modern React development with hooks and best practices",
-                "level": "Intermediate",
-                "image": "https://upload.wikimedia.org/wikipedia/commons/a/a7/React-icon.svg",
-                "duration": "6 weeks",
-                "modules": [
-                    {
-                        "id": "react-mod-1",
-                        "title": "React Fundamentals",
-                        "lessons": [
-                            {
-                                "id": "react-les-1",
-                                "title": "Introduction to React",
-                                "content": "Understanding React components and JSX...",
-                                "duration": "25 mins",
-                                "video_url": None
-                            },
-                            {
-                                "id": "react-les-2",
-                                "title": "State and Props",
-                                "content": "Managing component state and props in React...",
-                                "duration": "30 mins",
-                                "video_url": None
-                            }
-                        ],
-                        "quiz": {
-                            "id": "react-quiz-1",
-                            "title": "React Basics Quiz",
-                            "time_limit": 15,
-                            "questions": [
-                                {
-                                    "id": "q1",
-                                    "question": "Which hook is used for side effects in React?",
-                                    "options": [
-                                        "useState",
-                                        "useEffect",
-                                        "useContext",
-                                        "useReducer"
-                                    ],
-                                    "correct_answer": 1
-                                },
-                                {
-                                    "id": "q2",
-                                    "question": "What is the correct way to update state in React?",
-                                    "options": [
-                                        "this.state.count = 5",
-                                        "setState(count = 5)",
-                                        "setCount(5)",
-                                        "state.count = 5"
-                                    ],
-                                    "correct_answer": 2
-                                }
-                            ]
-                        }
-                    },
-                    {
-                        "id": "react-mod-2",
-                        "title": "React Hooks",
-                        "lessons": [
-                            {
-                                "id": "react-les-3",
-                                "title": "useState and useEffect",
-                                "content": "Working with React's most common hooks...",
-                                "duration": "35 mins",
-                                "video_url": None
-                            },
-                            {
-                                "id": "react-les-4",
-                                "title": "Custom Hooks",
-                                "content": "Creating and using custom React hooks...",
-                                "duration": "40 mins",
-                                "video_url": None
-                            }
-                        ],
-                        "quiz": {
-                            "id": "react-quiz-2",
-                            "title": "React Hooks Quiz",
-                            "time_limit": 15,
-                            "questions": [
-                                {
-                                    "id": "q1",
-                                    "question": "What is the purpose of the useState hook?",
-                                    "options": [
-                                        "To manage side effects",
-                                        "To manage state",
-                                        "To manage props",
-                                        "To manage context"
-                                    ],
-                                    "correct_answer": 1
-                                },
-                                {
-                                    "id": "q2",
-                                    "question": "What is the difference between useState and useReducer?",
-                                    "options": [
-                                        "useState is used for simple state, useReducer is used for complex state",
-                                        "useState is used for complex state, useReducer is used for simple state",
-                                        "useState is used for state, useReducer is used for props",
-                                        "useState is used for props, useReducer is used for state"
-                                    ],
-                                    "correct_answer": 0
-                                }
-                            ]
-                        }
-                    }
-                ]
-            }
-        }
+        # The catalog is read-only; course_catalog builds it once per process
+        self.courses = COURSES
         
-        # User progress tracking
-        self.user_progress = {}
+        # User progress tracking: an LRU of recently active users in front of a SQLite store.
+        # Updates are serialised per user through striped locks, so memory stays bounded however
+        # many users show up, and different users rarely wait on each other
+        self.user_progress = OrderedDict()
+        self._progress_lock = threading.Lock()
+        self._user_locks = [threading.Lock() for _ in range(PROGRESS_LOCK_STRIPES)]
+        self._progress_db = sqlite3.connect(PROGRESS_DB_PATH, check_same_thread=False)
+        self._progress_db.execute("PRAGMA journal_mode=WAL")
+        self._progress_db.execute("PRAGMA synchronous=NORMAL")
+        self._progress_db.execute(
+            "CREATE TABLE IF NOT EXISTS user_progress (user_id TEXT PRIMARY KEY, progress BLOB NOT NULL)"
+        )
+        self._progress_db_lock = threading.Lock()
+
+        # Course summaries for listings, and lower-cased level -> summaries so filtering by level is a lookup
+        self._all_courses = [
+            MappingProxyType({field: course[field] for field in COURSE_SUMMARY_FIELDS})
+            for course in self.courses.values()
+        ]
+        self._courses_by_level = {}
+        for course in self._all_courses:
+            self._courses_by_level.setdefault(course["level"].lower(), []).append(course)
+
+        # (course_id, module_id) -> module
+        self._modules_by_key = {
+            (course_id, module["id"]): module
+            for course_id, course in self.courses.items()
+            for module in course["modules"]
+        }
+
+        # (course_id, module_id) -> {question_id: correct_answer} for grading
+        self._answer_keys = {
+            key: {q["id"]: q["correct_answer"] for q in module["quiz"]["questions"]}
+            for key, module in self._modules_by_key.items()
+        }
+        # (course_id, module_id) -> (score for each possible number of correct answers,
+        # fewest correct answers that pass), so grading needs no arithmetic
+        self._score_tables = {
+            key: (
+                tuple((correct / len(answer_key)) * 100 for correct in range(len(answer_key) + 1)),
+                -(-PASS_PERCENT * len(answer_key) // 100)
+            )
+            for key, answer_key in self._answer_keys.items()
+            if answer_key
+        }
+        # Question ids and correct answers as an array for long quizzes; for the handful of
+        # questions in a typical quiz, building arrays costs more than the plain loop
+        self._answer_arrays = {}
+        for key, answer_key in self._answer_keys.items():
+            if len(answer_key) >= VECTORIZED_GRADING_MIN_QUESTIONS:
+                import numpy as np
+                self._answer_arrays[key] = (
+                    tuple(answer_key),
+                    np.fromiter(answer_key.values(), dtype=np.int64, count=len(answer_key))
+                )
+
+        # The catalog never changes at runtime, so the JSON for every course and course
+        # listing is encoded once here, with its ETag, and handed out as bytes
+        self._courses_payload_by_level = {None: _encode(self._all_courses)}
+        for level, courses in self._courses_by_level.items():
+            self._courses_payload_by_level[level] = _encode(courses)
+        self._no_courses_payload = _encode([])
+        self._course_payload = {course_id: _encode(course) for course_id, course in self.courses.items()}
+        self._module_payload = {key: _encode(module) for key, module in self._modules_by_key.items()}
+        # Full courses, and each course's modules and quizzes, for app.py's /courses routes;
+        # courses without modules have no entry, so those routes 404 as before
+        self._all_courses_full_payload = _encode(list(self.courses.values()))
+        self._course_modules_payload = {
+            course_id: _encode(course["modules"])
+            for course_id, course in self.courses.items()
+            if course["modules"]
+        }
+        self._course_quizzes_payload = {
+            course_id: _encode([module["quiz"] for module in course["modules"]])
+            for course_id, course in self.courses.items()
+            if course["modules"]
+        }
     
-    def get_courses(self, level: str = None) -> List[Course]:
-        """Get all courses or filter by level"""
+    def _user_lock(self, user_id: str) -> threading.Lock:
+        return self._user_locks[hash(user_id) % PROGRESS_LOCK_STRIPES]
+
+    def _cached_progress(self, user_id: str) -> Optional[Dict]:
+        """Get a user's progress from the LRU, falling back to the store; None if there is none"""
+        with self._progress_lock:
+            progress = self.user_progress.get(user_id)
+            if progress is not None:
+                self.user_progress.move_to_end(user_id)
+                return progress
+
+        with self._progress_db_lock:
+            row = self._progress_db.execute(
+                "SELECT progress FROM user_progress WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        progress = orjson.loads(row[0])
+        self._cache_progress(user_id, progress)
+        return progress
+
+    def _cache_progress(self, user_id: str, progress: Dict):
+        with self._progress_lock:
+            self.user_progress[user_id] = progress
+            self.user_progress.move_to_end(user_id)
+            # Evicted users are safe to drop: progress is only cached once it is in the store,
+            # or is the untouched default that get_user_progress rebuilds
+            while len(self.user_progress) > MAX_CACHED_PROGRESS_USERS:
+                self.user_progress.popitem(last=False)
+
+    def _store_progress(self, user_id: str, progress: Dict):
+        """Write a user's progress to the store; raises a 500 if the write fails"""
         try:
-            courses = list(self.courses.values())
-            if level:
-                courses = [course for course in courses if course["level"].lower() == level.lower()]
-            logger.info(f"Returning {len(courses)} courses")
-            return courses
-        except Exception as e:
-            logger.error(f"Error getting courses: {e}")
-            return []
+            with self._progress_db_lock:
+                self._progress_db.execute(
+                    "INSERT OR REPLACE INTO user_progress (user_id, progress) VALUES (?, ?)",
+                    (user_id, orjson.dumps(progress))
+                )
+                self._progress_db.commit()
+        except sqlite3.Error as e:
+            logger.error("Error storing progress for %s: %s", user_id, e)
+            raise HTTPException(status_code=500, detail="Failed to save progress") from e
+
+    def get_courses(self, level: str = None) -> List[Dict]:
+        """Get summaries of all courses or filter by level"""
+        if level:
+            return list(self._courses_by_level.get(level.lower(), ()))
+        return list(self._all_courses)
+
+    def get_courses_payload(self, level: str = None) -> Tuple[bytes, str]:
+        """Get summaries of all courses or filter by level, as encoded JSON and its ETag"""
+        return self._courses_payload_by_level.get(level.lower() if level else None, self._no_courses_payload)
+
+    def get_all_courses(self) -> List[Course]:
+        """Get all courses with their modules"""
+        return list(self.courses.values())
+
+    def get_course_details(self, course_id: str) -> Optional[Course]:
+        """Get a specific course by ID, or None if it doesn't exist"""
+        return self.courses.get(course_id)
+
+    def get_all_courses_payload(self) -> Tuple[bytes, str]:
+        """Get all courses with their modules, as encoded JSON and its ETag"""
+        return self._all_courses_full_payload
+
+    def get_course_details_payload(self, course_id: str) -> Optional[Tuple[bytes, str]]:
+        """Get a specific course by ID as encoded JSON and its ETag, or None if it doesn't exist"""
+        return self._course_payload.get(course_id)
+
+    def get_course_modules_payload(self, course_id: str) -> Optional[Tuple[bytes, str]]:
+        """Get all modules of a course as encoded JSON and its ETag, or None if it has none"""
+        return self._course_modules_payload.get(course_id)
+
+    def get_course_quizzes_payload(self, course_id: str) -> Optional[Tuple[bytes, str]]:
+        """Get the quiz of every module in a course as encoded JSON and its ETag, or None if it has none"""
+        return self._course_quizzes_payload.get(course_id)
+
+    def get_course_modules(self, course_id: str) -> List[Module]:
+        """Get all modules of a course"""
+        course = self.courses.get(course_id)
+        return course["modules"] if course else []
+
+    def get_course_quizzes(self, course_id: str) -> List[Quiz]:
+        """Get the quiz of every module in a course"""
+        return [module["quiz"] for module in self.get_course_modules(course_id)]
 
     def get_course(self, course_id: str) -> Course:
         """Get a specific course by ID"""
         if course_id not in self.courses:
-            raise HTTPException(status_code=404, detail="Course not found")
+            raise _COURSE_NOT_FOUND.with_traceback(None)
         return self.courses[course_id]
 
+    def get_course_payload(self, course_id: str) -> Tuple[bytes, str]:
+        """Get a specific course by ID, as encoded JSON and its ETag"""
+        if course_id not in self._course_payload:
+            raise _COURSE_NOT_FOUND.with_traceback(None)
+        return self._course_payload[course_id]
+
+    def get_module_payload(self, course_id: str, module_id: str) -> Tuple[bytes, str]:
+        """Get a specific module from a course, as encoded JSON and its ETag"""
+        payload = self._module_payload.get((course_id, module_id))
+        if payload is None:
+            # Raises the appropriate 404
+            self.get_module(course_id, module_id)
+        return payload
+
     def get_module(self, course_id: str, module_id: str) -> Module:
         """Get a specific module from a course"""
-        course = self.get_course(course_id)
-        for module in course["modules"]:
-            if module["id"] == module_id:
-                return module
-        raise HTTPException(status_code=404, detail="Module not found")
+        module = self._modules_by_key.get((course_id, module_id))
+        if module is None:
+            # Tell a missing course apart from a missing module
+            self.get_course(course_id)
+            raise _MODULE_NOT_FOUND.with_traceback(None)
+        return module
 
     def submit_quiz(self, course_id: str, module_id: str, user_id: str, answers: Dict[str, int]) -> Dict:
         """Submit quiz answers and get results"""
-        module = self.get_module(course_id, module_id)
-        quiz = module["quiz"]
-        questions = quiz["questions"]
+        answer_key = self._answer_keys.get((course_id, module_id))
+        if answer_key is None:
+            # Raises the appropriate 404
+            self.get_module(course_id, module_id)
         
-        total_questions = len(questions)
-        correct_answers = 0
+        total_questions = len(answer_key)
+        answer_array = self._answer_arrays.get((course_id, module_id))
+        if answer_array is not None:
+            import numpy as np
+            question_ids, correct = answer_array
+            # -1 marks an unanswered question and never matches a valid option index
+            submitted = np.fromiter(
+                (answers.get(question_id, -1) for question_id in question_ids),
+                dtype=np.int64,
+                count=len(question_ids)
+            )
+            correct_answers = int((submitted == correct).sum())
+        else:
+            correct_answers = sum(
+                1 for question_id, answer in answers.items()
+                if question_id in answer_key and answer_key[question_id] == answer
+            )
         
-        for question in questions:
-            question_id = question["id"]
-            if question_id in answers and answers[question_id] == question["correct_answer"]:
-                correct_answers += 1
+        scores, pass_min_correct = self._score_tables[(course_id, module_id)]
+        score = scores[correct_answers]
+        passed = correct_answers >= pass_min_correct
         
-        score = (correct_answers / total_questions) * 100
-        passed = score >= 70  # Pass threshold is 70%
-        
-        # Update user progress
-        if user_id not in self.user_progress:
-            self.user_progress[user_id] = {}
-        
-        if course_id not in self.user_progress[user_id]:
-            self.user_progress[user_id][course_id] = {
-                "completed": False,
-                "score": 0,
-                "passed": False
-            }
-        
-        self.user_progress[user_id][course_id]["score"] = max(
-            self.user_progress[user_id][course_id]["score"],
-            score
-        )
-        self.user_progress[user_id][course_id]["passed"] = (
-            self.user_progress[user_id][course_id]["passed"] or passed
-        )
+        # Update user progress on a copy, which replaces the cached progress only once it is stored
+        with self._user_lock(user_id):
+            user_progress = dict(self._cached_progress(user_id) or {})
+            progress = dict(user_progress.get(course_id, PROGRESS_DEFAULT))
+            progress["score"] = max(progress["score"], score)
+            progress["passed"] = progress["passed"] or passed
+            user_progress[course_id] = progress
+            self._store_progress(user_id, user_progress)
+            self._cache_progress(user_id, user_progress)
         
         return {
             "score": score,
@@ -588,16 +358,12 @@ class CourseLibrary:
 
     def get_user_progress(self, user_id: str) -> Dict:
         """Get user's course progress"""
-        if user_id not in self.user_progress:
-            self.user_progress[user_id] = {
-                course_id: {
-                    "completed": False,
-                    "score": 0,
-                    "passed": False
-                }
-                for course_id in self.courses.keys()
-            }
-        return self.user_progress[user_id]
+        with self._user_lock(user_id):
+            progress = self._cached_progress(user_id)
+            if progress is None:
+                progress = {course_id: dict(PROGRESS_DEFAULT) for course_id in self.courses}
+                self._cache_progress(user_id, progress)
+            return progress
 
 # Create a singleton instance
 course_library = CourseLibrary()
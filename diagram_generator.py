@@ -1,9 +1,29 @@
 import os
+import asyncio
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 import graphviz
 
+# Most source files handed to one dot or plantuml invocation, keeping the command line
+# well under the Windows length limit
+DIAGRAM_BATCH_SIZE = 50
+# Graphs with at least this many nodes cap dot's network simplex passes; past the second
+# threshold they switch to the near-linear sfdp layout altogether
+FAST_LAYOUT_MIN_NODES = 50
+SFDP_LAYOUT_MIN_NODES = 500
+# Network simplex iterations allowed per node when the layout is capped
+FAST_LAYOUT_NSLIMIT = '5'
+# Preamble shared by every sequence diagram
+PUML_HEADER = (
+    "@startuml\n"
+    "skinparam sequence {\n"
+    "    ParticipantBackgroundColor #FEFECE\n"
+    "    ParticipantBorderColor #666666\n"
+    "}\n\n"
+)
+
 @dataclass
 class ClassDefinition:
     name: str
@@ -15,10 +35,19 @@ class DiagramGenerator:
     def __init__(self):
         self.output_dir = 'generated_diagrams'
         os.makedirs(self.output_dir, exist_ok=True)
+        # Source files written but not yet rendered; see render_batch
+        self._pending_dot: List[str] = []
+        self._pending_puml: List[str] = []
+        # Configured once and copied for each diagram
+        self._class_template = graphviz.Digraph(comment='Class Diagram')
+        self._class_template.attr(rankdir='TB')
+        self._architecture_template = graphviz.Digraph(comment='Architecture Diagram')
+        self._architecture_template.attr(rankdir='TB')
     
-    def generate_class_diagram(self, classes: List[ClassDefinition], filename: str) -> str:
-        dot = graphviz.Digraph(comment='Class Diagram')
-        dot.attr(rankdir='TB')
+    def generate_class_diagram(self, classes: List[ClassDefinition], filename: str, defer: bool = False,
+                               fast_layout: Optional[bool] = None) -> str:
+        dot = self._class_template.copy()
+        self._apply_layout_limits(dot, len(classes), fast_layout)
         
         # Add classes
         for cls in classes:
@@ -30,46 +59,52 @@ class DiagramGenerator:
             for rel in cls.relationships:
                 dot.edge(cls.name, rel['target'], rel['type'])
         
-        # Save the diagram
-        output_path = os.path.join(self.output_dir, f"{filename}.png")
-        dot.render(output_path, format='png', cleanup=True)
-        return output_path
+        return self._queue_dot(dot, filename, defer)
+    
+    def generate_sequence_diagram(self, sequence_data: Dict, filename: str, defer: bool = False) -> str:
+        source_path = self._write_sequence_source(sequence_data, filename)
+        self._pending_puml.append(source_path)
+        if not defer:
+            self.render_batch()
+        return f"{os.path.splitext(source_path)[0]}.png"
+    
+    async def generate_sequence_diagram_async(self, sequence_data: Dict, filename: str) -> str:
+        """Like generate_sequence_diagram, for async callers: PlantUML runs as an asyncio
+        subprocess, so waiting on it doesn't block the event loop"""
+        source_path = self._write_sequence_source(sequence_data, filename)
+        try:
+            process = await asyncio.create_subprocess_exec('plantuml', source_path)
+            await process.wait()
+        except Exception as e:
+            raise Exception(f"Error generating sequence diagram: {str(e)}")
+        return f"{os.path.splitext(source_path)[0]}.png"
     
-    def generate_sequence_diagram(self, sequence_data: Dict, filename: str) -> str:
+    def _write_sequence_source(self, sequence_data: Dict, filename: str) -> str:
         # Create PlantUML content
-        puml_content = "@startuml\n"
-        puml_content += "skinparam sequence {\n"
-        puml_content += "    ParticipantBackgroundColor #FEFECE\n"
-        puml_content += "    ParticipantBorderColor #666666\n"
-        puml_content += "}\n\n"
+        parts = [PUML_HEADER]
         
         # Add participants
-        for participant in sequence_data['participants']:
-            puml_content += f"participant {participant}\n"
+        parts.extend(f"participant {participant}\n" for participant in sequence_data['participants'])
         
         # Add interactions
         for interaction in sequence_data['interactions']:
-            puml_content += f"{interaction['from']} -> {interaction['to']}: {interaction['message']}\n"
+            parts.append(f"{interaction['from']} -> {interaction['to']}: {interaction['message']}\n")
             if interaction.get('response'):
-                puml_content += f"{interaction['to']} --> {interaction['from']}: {interaction['response']}\n"
+                parts.append(f"{interaction['to']} --> {interaction['from']}: {interaction['response']}\n")
         
-        puml_content += "@enduml"
+        parts.append("@enduml")
+        puml_content = "".join(parts)
         
-        # Save and generate diagram
-        output_path = os.path.join(self.output_dir, f"{filename}")
-        with open(f"{output_path}.puml", 'w') as f:
+        # Save the source; PlantUML writes the PNG next to it
+        source_path = os.path.join(self.output_dir, f"{filename}.puml")
+        with open(source_path, 'w') as f:
             f.write(puml_content)
-        
-        # Convert to PNG using PlantUML
-        try:
-            subprocess.run(['plantuml', f"{output_path}.puml"])
-            return f"{output_path}.png"
-        except Exception as e:
-            raise Exception(f"Error generating sequence diagram: {str(e)}")
+        return source_path
     
-    def generate_architecture_diagram(self, components: Dict, filename: str) -> str:
-        dot = graphviz.Digraph(comment='Architecture Diagram')
-        dot.attr(rankdir='TB')
+    def generate_architecture_diagram(self, components: Dict, filename: str, defer: bool = False,
+                                      fast_layout: Optional[bool] = None) -> str:
+        dot = self._architecture_template.copy()
+        self._apply_layout_limits(dot, len(components['components']), fast_layout)
         
         # Add components
         for comp_name, comp_data in components['components'].items():
@@ -84,10 +119,59 @@ class DiagramGenerator:
                 style=conn.get('style', 'solid')
             )
         
-        # Save the diagram
-        output_path = os.path.join(self.output_dir, f"{filename}.png")
-        dot.render(output_path, format='png', cleanup=True)
-        return output_path
+        return self._queue_dot(dot, filename, defer)
+    
+    def _apply_layout_limits(self, dot: graphviz.Digraph, node_count: int, fast_layout: Optional[bool]):
+        # fast_layout=None decides by graph size; True or False forces it either way
+        if fast_layout is None:
+            fast_layout = node_count >= FAST_LAYOUT_MIN_NODES
+        if not fast_layout:
+            return
+        dot.graph_attr['nslimit'] = FAST_LAYOUT_NSLIMIT
+        dot.graph_attr['nslimit1'] = FAST_LAYOUT_NSLIMIT
+        if node_count >= SFDP_LAYOUT_MIN_NODES:
+            # Set in the source rather than dot.engine, since rendering goes through the dot CLI
+            dot.graph_attr['layout'] = 'sfdp'
+    
+    def _queue_dot(self, dot: graphviz.Digraph, filename: str, defer: bool) -> str:
+        # dot -O names the output after the source file, so the source has no extension
+        source_path = os.path.join(self.output_dir, filename)
+        dot.save(source_path)
+        self._pending_dot.append(source_path)
+        if not defer:
+            self.render_batch()
+        return f"{source_path}.png"
+    
+    def render_batch(self) -> List[str]:
+        """Render every deferred diagram and return the PNG paths. Sources are split into
+        batches, one dot or plantuml process each, and the processes run concurrently"""
+        dot_sources, self._pending_dot = self._pending_dot, []
+        puml_sources, self._pending_puml = self._pending_puml, []
+        
+        # The threads only wait on child processes, so the GIL isn't a concern
+        workers = os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(self._render_dot, batch) for batch in self._split_batches(dot_sources, workers)]
+            futures += [pool.submit(self._render_puml, batch) for batch in self._split_batches(puml_sources, workers)]
+            return [output_path for future in futures for output_path in future.result()]
+    
+    def _split_batches(self, sources: List[str], workers: int) -> List[List[str]]:
+        # Spread the sources over the workers, but never past DIAGRAM_BATCH_SIZE per process
+        size = min(DIAGRAM_BATCH_SIZE, max(1, -(-len(sources) // workers)))
+        return [sources[start:start + size] for start in range(0, len(sources), size)]
+    
+    def _render_dot(self, batch: List[str]) -> List[str]:
+        subprocess.run(['dot', '-Tpng', '-O', *batch], check=True)
+        for source_path in batch:
+            os.remove(source_path)
+        return [f"{source_path}.png" for source_path in batch]
+    
+    def _render_puml(self, batch: List[str]) -> List[str]:
+        try:
+            subprocess.run(['plantuml', *batch])
+        except Exception as e:
+            raise Exception(f"Error generating sequence diagram: {str(e)}")
+        return [f"{os.path.splitext(source_path)[0]}.png" for source_path in batch]
     
     def _format_attributes(self, attributes: List[str]) -> str:
         return '\n'.join(attributes) if attributes else ''
@@ -114,7 +198,7 @@ def example_usage():
             relationships=[]
         )
     ]
-    generator.generate_class_diagram(classes, 'class_diagram')
+    generator.generate_class_diagram(classes, 'class_diagram', defer=True)
     
     # Sequence diagram example
     sequence_data = {
@@ -134,7 +218,7 @@ def example_usage():
             }
         ]
     }
-    generator.generate_sequence_diagram(sequence_data, 'sequence_diagram')
+    generator.generate_sequence_diagram(sequence_data, 'sequence_diagram', defer=True)
     
     # Architecture diagram example
     architecture = {
@@ -153,7 +237,8 @@ def example_usage():
             {'from': 'User Service', 'to': 'Database', 'style': 'dashed'}
         ]
     }
-    generator.generate_architecture_diagram(architecture, 'architecture_diagram')
+    generator.generate_architecture_diagram(architecture, 'architecture_diagram', defer=True)
+    generator.render_batch()
 
 if __name__ == '__main__':
     example_usage()
\ No newline at end of file
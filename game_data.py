@@ -1,44 +1,68 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+import heapq
+import itertools
 import uuid
-from datetime import datetime
+from timestamps import iso_now
 
-# Store game scores in memory (in a real app, this would be in a database)
-game_scores: Dict[str, List[Dict]] = {}
+# Scores kept per user
+MAX_SCORES_PER_USER = 10
+# Users shown on the global leaderboard
+LEADERBOARD_SIZE = 10
+
+# Store game scores in memory (in a real app, this would be in a database).
+# Each user's best scores are a min-heap of (rank key, tie-breaker, score), so the
+# weakest score is always at the front and cheap to replace
+game_scores: Dict[str, List[Tuple]] = {}
+# Later scores get smaller tie-breakers, so among equal scores the oldest are kept and listed first
+_score_sequence = itertools.count()
+# Each user's best heap item, and the leaderboard built from them; it is only rebuilt
+# after someone's best score changes
+_user_best: Dict[str, Tuple] = {}
+_cached_leaderboard: Optional[List[Dict]] = None
+
+def _rank_key(entry: Dict) -> Tuple:
+    # Higher score first, then faster completion
+    return (entry['score'], -entry['completion_time'])
 
 def save_game_score(user_id: str, score: int, completion_time: float):
     """Save a game score for a user"""
-    if user_id not in game_scores:
-        game_scores[user_id] = []
-    
-    game_scores[user_id].append({
+    global _cached_leaderboard
+    entry = {
         'id': str(uuid.uuid4()),
         'score': score,
         'completion_time': completion_time,
-        'timestamp': datetime.now().isoformat()
-    })
+        'timestamp': iso_now()
+    }
+    item = (_rank_key(entry), -next(_score_sequence), entry)
     
     # Keep only top 10 scores
-    game_scores[user_id] = sorted(
-        game_scores[user_id],
-        key=lambda x: (x['score'], -x['completion_time']),
-        reverse=True
-    )[:10]
+    heap = game_scores.setdefault(user_id, [])
+    if len(heap) < MAX_SCORES_PER_USER:
+        heapq.heappush(heap, item)
+    else:
+        heapq.heappushpop(heap, item)
+    
+    best = _user_best.get(user_id)
+    if best is None or item > best:
+        _user_best[user_id] = item
+        _cached_leaderboard = None
 
 def get_user_scores(user_id: str) -> List[Dict]:
     """Get all scores for a user"""
-    return game_scores.get(user_id, [])
+    return [entry for _, _, entry in sorted(game_scores.get(user_id, []), reverse=True)]
 
 def get_leaderboard() -> List[Dict]:
     """Get global leaderboard"""
-    all_scores = []
-    for user_id, scores in game_scores.items():
-        if scores:
-            best_score = max(scores, key=lambda x: (x['score'], -x['completion_time']))
-            all_scores.append({
+    global _cached_leaderboard
+    if _cached_leaderboard is None:
+        top_users = heapq.nlargest(LEADERBOARD_SIZE, _user_best.items(), key=lambda user: user[1][0])
+        _cached_leaderboard = [
+            {
                 'user_id': user_id,
                 'score': best_score['score'],
                 'completion_time': best_score['completion_time'],
                 'timestamp': best_score['timestamp']
-            })
-    
-    return sorted(all_scores, key=lambda x: (x['score'], -x['completion_time']), reverse=True)[:10]
+            }
+            for user_id, (_, _, best_score) in top_users
+        ]
+    return _cached_leaderboard
@@ -1,15 +1,45 @@
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from typing import List, Dict
 import logging
-from datetime import datetime
-from course_data import course_library
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from timestamps import iso_now
+from course_data import course_library, catalog_response
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging. Records go through a queue to a background listener thread, so
+# request handling never blocks on writing to the console; force replaces any handler
+# an imported module configured first
+_log_queue = queue.Queue(-1)
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_log_queue)], force=True)
+# basicConfig gives the QueueHandler the usual format, so the listener writes records as they come
+_log_listener = QueueListener(_log_queue, logging.StreamHandler())
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="FinLearn Pro API")
+class RequestLoggingMiddleware:
+    """Log each request's path and response status. A plain ASGI middleware, so requests
+    skip the extra task and body streaming of @app.middleware("http")"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        logger.info("Request path: %s", scope["path"])
+
+        async def send_with_logging(message):
+            if message["type"] == "http.response.start":
+                logger.info("Response status: %s", message["status"])
+            await send(message)
+
+        await self.app(scope, receive, send_with_logging)
+
+app = FastAPI(title="FinLearn Pro API", default_response_class=ORJSONResponse)
 
 # Configure CORS to allow all origins during development
 app.add_middleware(
@@ -20,36 +50,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger JSON bodies such as the course catalog
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=5)
+
 # Add middleware to log all requests
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    logger.info(f"Request path: {request.url.path}")
-    response = await call_next(request)
-    logger.info(f"Response status: {response.status_code}")
-    return response
+app.add_middleware(RequestLoggingMiddleware)
+
+@app.on_event("startup")
+async def start_log_listener():
+    _log_listener.start()
+
+@app.on_event("shutdown")
+async def stop_log_listener():
+    _log_listener.stop()
 
 @app.get("/api/courses")
-async def get_courses(level: str = None):
-    """Get all courses or filter by level"""
-    return course_library.get_courses(level)
+async def get_courses(request: Request, level: str = None):
+    """Get summaries of all courses or filter by level; the full course is at /courses/{course_id}"""
+    return catalog_response(request, course_library.get_courses_payload(level))
 
 @app.get("/api/courses/{course_id}")
-async def get_course(course_id: str):
+async def get_course(course_id: str, request: Request):
     """Get a specific course by ID"""
-    return course_library.get_course(course_id)
+    return catalog_response(request, course_library.get_course_payload(course_id))
 
 @app.get("/api/courses/{course_id}/modules/{module_id}")
-async def get_module(course_id: str, module_id: str):
+async def get_module(course_id: str, module_id: str, request: Request):
     """Get a specific module from a course"""
-    return course_library.get_module(course_id, module_id)
+    return catalog_response(request, course_library.get_module_payload(course_id, module_id))
 
+# Progress routes are plain functions, which FastAPI runs in its threadpool, so reads and
+# writes of the SQLite progress store never block the event loop
 @app.post("/api/courses/{course_id}/modules/{module_id}/quiz")
-async def submit_quiz(course_id: str, module_id: str, user_id: str, answers: Dict[str, int]):
+def submit_quiz(course_id: str, module_id: str, user_id: str, answers: Dict[str, int]):
     """Submit quiz answers and get results"""
     return course_library.submit_quiz(course_id, module_id, user_id, answers)
 
 @app.get("/api/users/{user_id}/progress")
-async def get_user_progress(user_id: str):
+def get_user_progress(user_id: str):
     """Get user's course progress"""
     return course_library.get_user_progress(user_id)
 
@@ -58,4 +96,4 @@ async def health_check():
     """
     Health check endpoint
     """
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {"status": "healthy", "timestamp": iso_now()}
@@ -2,10 +2,16 @@ import yfinance as yf
 import pandas as pd
 import numpy as np
 import asyncio
+import heapq
 import aiohttp
 import logging
+import math
 import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 from datetime import datetime, timedelta
+from timestamps import iso_now
 from typing import Dict, List, Optional
 
 # Configure logging
@@ -15,6 +21,13 @@ logger = logging.getLogger(__name__)
 # You should get your API key from Alpha Vantage: https://www.alphavantage.co/
 ALPHA_VANTAGE_API_KEY = "demo"  # Replace with your actual API key
 BASE_URL = "https://www.alphavantage.co/query"
+# Connections kept open to the quote API, shared by all fetches
+MAX_API_CONNECTIONS = 32
+DNS_CACHE_TTL_SECONDS = 300
+# Threads for yfinance, whose calls block; enough to fetch every tracked symbol at once
+YFINANCE_WORKERS = 16
+# Quotes only move about once a minute, so a fetched quote is served for this long
+QUOTE_TTL_SECONDS = 60
 
 class MarketDataService:
     def __init__(self):
@@ -25,6 +38,33 @@ class MarketDataService:
             "AAPL", "MSFT", "GOOGL", "AMZN", "META", 
             "NVDA", "TSLA", "JPM", "V", "WMT"
         ]
+        # One pooled session for all API calls, created on first use inside the event loop
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._yfinance_executor = ThreadPoolExecutor(max_workers=YFINANCE_WORKERS, thread_name_prefix="yfinance")
+        # symbol -> (monotonic fetch time, quote), and the fetch in progress per symbol
+        # that concurrent callers wait on instead of starting their own
+        self._quote_cache: Dict[str, tuple] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # (monotonic fetch time, overview) of the last successful market overview
+        self._overview_cache: Optional[tuple] = None
+        
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=MAX_API_CONNECTIONS, ttl_dns_cache=DNS_CACHE_TTL_SECONDS)
+            )
+        return self._session
+    
+    async def close(self):
+        """Close the pooled HTTP session and the yfinance threads"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self._yfinance_executor.shutdown(wait=False)
+    
+    async def _run_blocking(self, func, *args):
+        """Run a blocking yfinance call on the worker threads instead of the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self._yfinance_executor, func, *args)
         
     async def fetch_stock_data(self, symbol: str) -> Optional[Dict]:
         """Fetch real-time stock data from Alpha Vantage API"""
@@ -35,19 +75,19 @@ class MarketDataService:
                 "apikey": ALPHA_VANTAGE_API_KEY
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(BASE_URL, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if "Global Quote" in data:
-                            quote = data["Global Quote"]
-                            return {
-                                "symbol": symbol,
-                                "price": float(quote.get("05. price", 0)),
-                                "change": float(quote.get("09. change", 0)),
-                                "change_percent": float(quote.get("10. change percent", "0").strip("%")),
-                                "volume": int(quote.get("06. volume", 0)),
-                            }
+            session = await self._get_session()
+            async with session.get(BASE_URL, params=params) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if "Global Quote" in data:
+                        quote = data["Global Quote"]
+                        return {
+                            "symbol": symbol,
+                            "price": float(quote.get("05. price", 0)),
+                            "change": float(quote.get("09. change", 0)),
+                            "change_percent": float(quote.get("10. change percent", "0").strip("%")),
+                            "volume": int(quote.get("06. volume", 0)),
+                        }
         except Exception as e:
             logger.error(f"Error fetching data for {symbol}: {str(e)}")
         
@@ -79,10 +119,7 @@ class MarketDataService:
             "price": base_price + change,
             "change": change_percent,
             "volume": random.randint(500000, 5000000),
-            "chart_data": [
-                base_price + random.uniform(-5, 5) 
-                for _ in range(10)
-            ]
+            "chart_data": (base_price + np.random.uniform(-5, 5, 10)).tolist()
         }
 
     def get_company_name(self, symbol: str) -> str:
@@ -102,19 +139,43 @@ class MarketDataService:
         return names.get(symbol, symbol)
 
     async def get_real_time_stock_data(self, symbol: str) -> Dict:
-        """Get real-time data for a single stock"""
+        """Get real-time data for a single stock, reusing a recent or in-progress fetch"""
+        cached = self._quote_cache.get(symbol)
+        if cached and time.monotonic() - cached[0] < QUOTE_TTL_SECONDS:
+            return cached[1]
+        
+        inflight = self._inflight.get(symbol)
+        if inflight is not None:
+            # Shielded so a caller going away doesn't cancel the fetch for everyone else
+            return await asyncio.shield(inflight)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[symbol] = future
+        data = None
+        try:
+            data = await self._fetch_real_time_stock_data(symbol)
+            # Failures aren't cached, so the next request tries again
+            if data is not None:
+                self._quote_cache[symbol] = (time.monotonic(), data)
+        finally:
+            del self._inflight[symbol]
+            # Waiters get None if this fetch was cancelled
+            future.set_result(data)
+        return data
+    
+    async def _fetch_real_time_stock_data(self, symbol: str) -> Optional[Dict]:
         try:
             logger.info(f"Fetching data for {symbol}")
             stock = yf.Ticker(symbol)
             
             # Get basic info
-            info = stock.info
+            info = await self._run_blocking(lambda: stock.info)
             if not info:
                 logger.error(f"No info available for {symbol}")
                 return None
                 
             # Get historical data
-            hist = stock.history(period="2d")
+            hist = await self._run_blocking(lambda: stock.history(period="2d"))
             if len(hist) < 2:
                 logger.error(f"Insufficient historical data for {symbol}")
                 return None
@@ -136,7 +197,7 @@ class MarketDataService:
                 "market_cap": info.get('marketCap', 0),
                 "volume": info.get('volume', 0),
                 "technical_indicators": technical_indicators,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": iso_now()
             }
             
             logger.info(f"Successfully fetched data for {symbol}")
@@ -149,44 +210,62 @@ class MarketDataService:
     def calculate_technical_indicators(self, hist: pd.DataFrame) -> Dict:
         """Calculate technical indicators for a stock"""
         try:
-            close_prices = hist['Close']
+            close_prices = hist['Close'].to_numpy(dtype=float)
             
-            # Calculate moving averages
-            ma20 = close_prices.rolling(window=20).mean().iloc[-1]
-            ma50 = close_prices.rolling(window=50).mean().iloc[-1]
+            # Only the latest value of each indicator is reported, so only the trailing
+            # window is averaged instead of rolling over the whole history
+            ma20 = self._trailing_mean(close_prices, 20)
+            ma50 = self._trailing_mean(close_prices, 50)
             
-            # Calculate RSI
-            delta = close_prices.diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs)).iloc[-1]
+            # Calculate RSI from the average gain and loss over the last 14 closes; the
+            # first close has no change before it and counts as zero
+            if len(close_prices) >= 14:
+                delta = np.diff(close_prices[-15:])
+                gain = np.where(delta > 0, delta, 0).sum() / 14
+                loss = np.where(delta < 0, -delta, 0).sum() / 14
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    rs = np.float64(gain) / loss
+                rsi = 100 - (100 / (1 + rs))
+            else:
+                rsi = np.nan
             
             return {
-                "ma20": round(float(ma20), 2) if not pd.isna(ma20) else 0,
-                "ma50": round(float(ma50), 2) if not pd.isna(ma50) else 0,
-                "rsi": round(float(rsi), 2) if not pd.isna(rsi) else 50
+                "ma20": round(float(ma20), 2) if not math.isnan(ma20) else 0,
+                "ma50": round(float(ma50), 2) if not math.isnan(ma50) else 0,
+                "rsi": round(float(rsi), 2) if not math.isnan(rsi) else 50
             }
             
         except Exception as e:
             logger.error(f"Error calculating technical indicators: {str(e)}")
             return {"ma20": 0, "ma50": 0, "rsi": 50}
             
+    def _trailing_mean(self, values: np.ndarray, window: int) -> float:
+        # NaN until there are enough values, like a pandas rolling mean
+        return values[-window:].mean() if len(values) >= window else np.nan
+    
     async def get_market_overview(self) -> Dict:
-        """Get overall market statistics"""
+        """Get overall market statistics, reusing an overview fetched within the quote TTL"""
+        if self._overview_cache and time.monotonic() - self._overview_cache[0] < QUOTE_TTL_SECONDS:
+            return self._overview_cache[1]
+        
         try:
             logger.info("Fetching market overview")
             sp500 = yf.Ticker("^GSPC")
             vix = yf.Ticker("^VIX")
+            sp500_info, vix_info = await asyncio.gather(
+                self._run_blocking(lambda: sp500.info),
+                self._run_blocking(lambda: vix.info)
+            )
             
             overview = {
-                "total_volume": sp500.info.get("volume", 0),
-                "market_cap": sp500.info.get("marketCap", 0),
+                "total_volume": sp500_info.get("volume", 0),
+                "market_cap": sp500_info.get("marketCap", 0),
                 "active_stocks": 500,
-                "volatility_index": vix.info.get("regularMarketPrice", 0)
+                "volatility_index": vix_info.get("regularMarketPrice", 0)
             }
             
             logger.info("Successfully fetched market overview")
+            self._overview_cache = (time.monotonic(), overview)
             return overview
             
         except Exception as e:
@@ -198,21 +277,21 @@ class MarketDataService:
                 "volatility_index": 0
             }
             
-    async def get_real_time_market_data(self) -> Dict:
-        """Get comprehensive real-time market data"""
+    async def get_real_time_market_data(self, top_k: Optional[int] = None) -> Dict:
+        """Get comprehensive real-time market data, with the top_k largest stocks or all of them"""
         try:
             logger.info("Starting to fetch market data")
             
-            # Fetch market overview
-            market_overview = await self.get_market_overview()
-            
-            # Fetch stock data concurrently
+            # Fetch the market overview and stock data concurrently
             tasks = [self.get_real_time_stock_data(symbol) for symbol in self.stock_symbols]
-            stock_data = await asyncio.gather(*tasks)
+            market_overview, *stock_data = await asyncio.gather(self.get_market_overview(), *tasks)
             
-            # Filter out None values and sort by market cap
+            # Filter out None values and sort by market cap; for a top k, only those k are ordered
             valid_stocks = [data for data in stock_data if data is not None]
-            sorted_stocks = sorted(valid_stocks, key=lambda x: x['market_cap'], reverse=True)
+            if top_k is None:
+                sorted_stocks = sorted(valid_stocks, key=itemgetter('market_cap'), reverse=True)
+            else:
+                sorted_stocks = heapq.nlargest(top_k, valid_stocks, key=itemgetter('market_cap'))
             
             logger.info(f"Successfully fetched data for {len(valid_stocks)} stocks")
             
@@ -259,7 +338,7 @@ class MarketDataService:
                         "name": "S&P 500",
                         "value": 4200.50 + random.uniform(-20, 20),
                         "change": random.uniform(-1, 1),
-                        "chart_data": [4180 + random.uniform(-10, 10) for _ in range(10)]
+                        "chart_data": (4180 + np.random.uniform(-10, 10, 10)).tolist()
                     }
                 ],
                 "market_summary": {
@@ -268,13 +347,34 @@ class MarketDataService:
                     "declining_stocks": len(stock_data) - advancing,
                     "volatility_index": 15 + random.uniform(-2, 2)
                 },
-                "timestamp": datetime.now().isoformat()
+                "timestamp": iso_now()
             }
             
             self.last_update = datetime.now()
         
         return self.stocks_cache
 
+# Simulated quotes: name, value range, and the largest change either way
+SIMULATED_INDICES = (
+    ("SP500", 4000, 4500, 50),
+    ("NASDAQ", 14000, 15000, 100),
+    ("DOW", 33000, 34000, 200),
+)
+SIMULATED_TRENDING_STOCKS = (
+    ("AAPL", 170, 180, 5),
+    ("MSFT", 330, 340, 7),
+    ("GOOGL", 140, 150, 4),
+)
+
+def _simulate_quotes(quotes):
+    # One NumPy draw for all values and one for all changes, rounded to cents
+    names, lows, highs, max_changes = zip(*quotes)
+    max_changes = np.array(max_changes)
+    values = np.round(np.random.uniform(lows, highs), 2)
+    changes = np.round(np.random.uniform(-max_changes, max_changes), 2)
+    percent_changes = np.round(changes / values * 100, 2)
+    return names, values.tolist(), changes.tolist(), percent_changes.tolist()
+
 async def get_real_time_market_data() -> Dict:
     """
     Simulates real-time market data
@@ -285,50 +385,19 @@ async def get_real_time_market_data() -> Dict:
     # Generate mock market data
     current_time = datetime.now()
     
+    names, values, changes, percent_changes = _simulate_quotes(SIMULATED_INDICES)
     market_indices = {
-        'SP500': {
-            'value': round(random.uniform(4000, 4500), 2),
-            'change': round(random.uniform(-50, 50), 2),
-        },
-        'NASDAQ': {
-            'value': round(random.uniform(14000, 15000), 2),
-            'change': round(random.uniform(-100, 100), 2),
-        },
-        'DOW': {
-            'value': round(random.uniform(33000, 34000), 2),
-            'change': round(random.uniform(-200, 200), 2),
-        }
+        name: {'value': value, 'change': change, 'percent_change': percent_change}
+        for name, value, change, percent_change in zip(names, values, changes, percent_changes)
     }
     
-    # Add percentage changes
-    for index in market_indices:
-        market_indices[index]['percent_change'] = round(
-            (market_indices[index]['change'] / market_indices[index]['value']) * 100, 2
-        )
-    
     # Generate some trending stocks
+    symbols, prices, changes, percent_changes = _simulate_quotes(SIMULATED_TRENDING_STOCKS)
     trending_stocks = [
-        {
-            'symbol': 'AAPL',
-            'price': round(random.uniform(170, 180), 2),
-            'change': round(random.uniform(-5, 5), 2),
-        },
-        {
-            'symbol': 'MSFT',
-            'price': round(random.uniform(330, 340), 2),
-            'change': round(random.uniform(-7, 7), 2),
-        },
-        {
-            'symbol': 'GOOGL',
-            'price': round(random.uniform(140, 150), 2),
-            'change': round(random.uniform(-4, 4), 2),
-        }
+        {'symbol': symbol, 'price': price, 'change': change, 'percent_change': percent_change}
+        for symbol, price, change, percent_change in zip(symbols, prices, changes, percent_changes)
     ]
     
-    # Add percentage changes for stocks
-    for stock in trending_stocks:
-        stock['percent_change'] = round((stock['change'] / stock['price']) * 100, 2)
-    
     return {
         'timestamp': current_time.isoformat(),
         'market_indices': market_indices,
@@ -2,14 +2,33 @@ import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from typing import List, Dict
+from itertools import islice
 import pandas as pd
-from datetime import datetime
+from timestamps import iso_now
 
 class RecommendationSystem:
     def __init__(self):
         self.vectorizer = TfidfVectorizer(stop_words='english')
         self.user_interactions = {}
         self.courses_db = {}
+        # TF-IDF matrix of the course descriptions and the courses in the same row order;
+        # fitted on first use and dropped whenever a course is added
+        self._course_matrix = None
+        self._course_list: List[Dict] = []
+        
+    def add_course(self, course_id: str, course: Dict):
+        """
+        Add or replace a course; use this rather than writing to courses_db so the
+        course matrix is refitted
+        """
+        self.courses_db[course_id] = course
+        self._course_matrix = None
+        
+    def _fit_courses(self):
+        self._course_list = list(self.courses_db.values())
+        self._course_matrix = self.vectorizer.fit_transform(
+            [course["description"] for course in self._course_list]
+        )
         
     def update_user_interaction(self, user_id: str, interaction_data: Dict):
         """
@@ -19,7 +38,7 @@ class RecommendationSystem:
             self.user_interactions[user_id] = []
         self.user_interactions[user_id].append({
             **interaction_data,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": iso_now()
         })
         
     def get_course_recommendations(self, user_id: str, n_recommendations: int = 5) -> List[Dict]:
@@ -39,14 +58,24 @@ class RecommendationSystem:
             for interaction in user_history
         ])
         
-        # Calculate similarity with available courses
-        course_vectors = self.vectorizer.fit_transform([user_interests] + 
-                                                     [course["description"] for course in self.courses_db.values()])
-        similarities = cosine_similarity(course_vectors[0:1], course_vectors[1:])
+        if not self.courses_db:
+            return []
+        if self._course_matrix is None:
+            self._fit_courses()
+        
+        # Calculate similarity with available courses; the vocabulary comes from the
+        # course descriptions, so only the user's vector is computed per request
+        user_vector = self.vectorizer.transform([user_interests])
+        similarities = cosine_similarity(user_vector, self._course_matrix)
         
-        # Get top N recommendations
-        top_indices = similarities[0].argsort()[-n_recommendations:][::-1]
-        recommendations = [list(self.courses_db.values())[i] for i in top_indices]
+        # Get top N recommendations: partition out the best N, then sort just those
+        scores = similarities[0]
+        n_top = min(n_recommendations, len(scores))
+        if n_top <= 0:
+            return []
+        top_indices = np.argpartition(-scores, n_top - 1)[:n_top]
+        top_indices = top_indices[np.argsort(-scores[top_indices])]
+        recommendations = [self._course_list[i] for i in top_indices]
         
         return recommendations
         
@@ -55,4 +84,4 @@ class RecommendationSystem:
         Get trending courses for new users
         """
         # In a real implementation, this would be based on overall popularity
-        return list(self.courses_db.values())[:n_courses]
+        return list(islice(self.courses_db.values(), n_courses))
@@ -0,0 +1,14 @@
+import os
+from functools import lru_cache
+
+# Shared state for running several workers; without it, consultations and websocket
+# broadcasts stay inside each process
+REDIS_URL = os.getenv("REDIS_URL")
+
+@lru_cache(maxsize=1)
+def get_redis():
+    """Shared async Redis client, or None when REDIS_URL isn't set"""
+    if not REDIS_URL:
+        return None
+    import redis.asyncio as redis
+    return redis.from_url(REDIS_URL)
@@ -0,0 +1,45 @@
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+class ResponseCache:
+    """Cache tutor answers by module content and question, matched exactly after normalising case,
+    whitespace and trailing punctuation. Similarity matching is deliberately avoided: questions
+    with opposite meanings ("should I invest" / "should I not invest") look alike as text"""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        # (content hash, normalised question) -> response, least recently used first
+        self.entries: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, module_content: str, question: str) -> Tuple[str, str]:
+        content_key = hashlib.blake2b((module_content or "").encode(), digest_size=16).hexdigest()
+        normalised = _WHITESPACE_RE.sub(" ", question.lower()).strip().rstrip("?!. ")
+        return content_key, normalised
+
+    def get(self, module_content: str, question: str) -> Optional[str]:
+        """Return the cached response for the same question on the same module, or None on a miss"""
+        key = self._key(module_content, question)
+        with self._lock:
+            response = self.entries.get(key)
+            if response is not None:
+                self.entries.move_to_end(key)
+                logger.debug("Response cache hit")
+        return response
+
+    def add(self, module_content: str, question: str, response: str):
+        """Store a response, evicting the least recently used entries once the cache is full"""
+        key = self._key(module_content, question)
+        with self._lock:
+            self.entries[key] = response
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
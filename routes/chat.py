@@ -1,66 +1,67 @@
 from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Optional
 from ai_service import ai_service as ai_tutor_service
-import uuid
-from datetime import datetime
+import secrets
+from timestamps import iso_now
 import logging
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 # Create router without prefix since main.py handles the /api prefix
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 class ChatRequest(BaseModel):
     message: str
     context: Optional[str] = "financial_learning"
+    user_id: Optional[str] = None
 
 @router.post("/chat/tutor")
-async def chat(request: Request):
+async def chat(chat_request: ChatRequest, request: Request):
     try:
-        # Get the request data
-        data = await request.json()
-        chat_request = ChatRequest(**data)
-        
-        # Generate a unique user ID for the session
-        user_id = "session_" + str(uuid.uuid4())
+        # Reuse the caller's id so the conversation and chat session carry over between turns
+        user_id = chat_request.user_id or request.headers.get("x-user-id")
+        if not user_id:
+            user_id = "session_" + secrets.token_hex(8)
+            logger.info("No user_id in chat request, using one-off id %s", user_id)
         
         # Log incoming request
-        logger.info(f"Received chat request - User ID: {user_id}, Context: {chat_request.context}")
+        logger.debug("Received chat request - User ID: %s, context of %d characters", user_id, len(chat_request.context or ""))
         
         try:
             # Generate response using AI service
-            response = ai_tutor_service.generate_response(
+            response = await ai_tutor_service.generate_response(
                 user_id=user_id,
                 module_content=chat_request.context,
                 question=chat_request.message
             )
             
             if not response or not isinstance(response, dict):
-                logger.error(f"Invalid response format from AI service: {response}")
+                logger.error("Invalid response format from AI service: %s", response)
                 raise HTTPException(
                     status_code=500,
                     detail="Invalid response from AI service"
                 )
             
             if response.get('status') == 'error':
-                logger.error(f"AI service error: {response.get('message')}")
+                logger.error("AI service error: %s", response.get('message'))
                 raise HTTPException(
                     status_code=500,
                     detail=response.get('message', 'An unexpected error occurred')
                 )
             
             # Log successful response
-            logger.info(f"Successfully generated response for user {user_id}")
+            logger.debug("Successfully generated response for user %s", user_id)
             
             return {
                 "response": response.get("message", ""),
-                "timestamp": response.get("timestamp", datetime.now().isoformat())
+                "timestamp": response.get("timestamp") or iso_now()
             }
             
         except Exception as e:
-            logger.error(f"Error generating AI response: {str(e)}")
+            logger.error("Error generating AI response: %s", e)
             raise HTTPException(
                 status_code=500,
                 detail="Error generating AI response"
@@ -69,12 +70,9 @@ async def chat(request: Request):
     except HTTPException as he:
         # Re-raise HTTP exceptions
         raise he
-    except ValueError as e:
-        logger.error(f"Validation error: {str(e)}")
-        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         # Log unexpected errors
-        logger.error(f"Unexpected error in chat endpoint: {str(e)}")
+        logger.error("Unexpected error in chat endpoint: %s", e)
         raise HTTPException(
             status_code=500,
             detail="An unexpected error occurred"
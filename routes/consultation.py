@@ -1,82 +1,131 @@
-from fastapi import APIRouter, HTTPException, Request
-from typing import Dict
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Set
 from datetime import datetime
 import logging
+import re
+import time
 import uuid
+import orjson
 
-router = APIRouter()
+from redis_store import get_redis
+
+router = APIRouter(default_response_class=ORJSONResponse)
 logger = logging.getLogger(__name__)
 
-# In-memory storage for consultations (replace with database in production)
+# Consultations live in Redis when it's configured, so every worker sees them, and
+# expire after this long; otherwise they're kept in this process's memory
+CONSULTATION_TTL_SECONDS = 86400
 consultations = {}
+# Consultation ids by email and by status, kept next to consultations so lookups by
+# either never scan every record
+consultations_by_email: Dict[str, List[str]] = {}
+consultations_by_status: Dict[str, Set[str]] = {}
+
+# Canned responses by consultation topic; read-only and shared by every request
+_INVESTMENT_RESPONSE: Mapping[str, Any] = MappingProxyType({
+    "type": "investment",
+    "message": "Based on your interest in investments, I'll prepare a personalized portfolio analysis. We'll discuss investment strategies, risk assessment, and market opportunities during our consultation.",
+    "preparation_tips": (
+        "Review your current investment portfolio",
+        "List your financial goals",
+        "Consider your risk tolerance level"
+    )
+})
+_BUDGET_RESPONSE: Mapping[str, Any] = MappingProxyType({
+    "type": "budget",
+    "message": "I'll help you optimize your budget and develop effective saving strategies. We'll analyze your spending patterns and create a personalized savings plan.",
+    "preparation_tips": (
+        "Gather your recent bank statements",
+        "List your monthly expenses",
+        "Identify your savings goals"
+    )
+})
+_GENERAL_RESPONSE: Mapping[str, Any] = MappingProxyType({
+    "type": "general",
+    "message": "I look forward to our consultation. To make the most of our session, please prepare any specific questions or financial documents you'd like to discuss.",
+    "preparation_tips": (
+        "Write down your financial questions",
+        "Gather relevant financial documents",
+        "Think about your short and long-term goals"
+    )
+})
+
+# Topic keywords and their response, in priority order: a topic mentioning keywords of
+# several kinds gets the first kind's response. Adding keywords or kinds only means
+# editing this table; they're compiled into a single case-insensitive match below
+_TOPIC_TABLE = (
+    ("investment", ("investment", "portfolio"), _INVESTMENT_RESPONSE),
+    ("budget", ("budget", "saving"), _BUDGET_RESPONSE),
+)
+_TOPIC_RESPONSES: Mapping[str, Mapping[str, Any]] = MappingProxyType(
+    {kind: response for kind, _, response in _TOPIC_TABLE}
+)
+_TOPIC_RE = re.compile(
+    "|".join(
+        f"(?=.*?(?P<{kind}>{'|'.join(map(re.escape, keywords))}))"
+        for kind, keywords, _ in _TOPIC_TABLE
+    ),
+    re.IGNORECASE | re.DOTALL
+)
+
+class ConsultationRequest(BaseModel):
+    name: str
+    email: str
+    date: str
+    time: str
+    topic: str = ""
 
 @router.post("/consultation/schedule")
-async def schedule_consultation(request: Request):
+async def schedule_consultation(consultation_request: ConsultationRequest):
     """Schedule a consultation and get initial AI analysis"""
-    try:
-        data = await request.json()
-        consultation_id = str(uuid.uuid4())
-        
-        # Store consultation details
-        consultations[consultation_id] = {
-            "id": consultation_id,
-            "name": data.get("name"),
-            "email": data.get("email"),
-            "date": data.get("date"),
-            "time": data.get("time"),
-            "topic": data.get("topic"),
-            "status": "scheduled",
-            "created_at": datetime.now().isoformat()
-        }
-        
-        # Generate AI response based on consultation topic
-        topic = data.get("topic", "").lower()
-        
-        # Prepare personalized response based on topic keywords
-        if "investment" in topic or "portfolio" in topic:
-            ai_response = {
-                "type": "investment",
-                "message": "Based on your interest in investments, I'll prepare a personalized portfolio analysis. We'll discuss investment strategies, risk assessment, and market opportunities during our consultation.",
-                "preparation_tips": [
-                    "Review your current investment portfolio",
-                    "List your financial goals",
-                    "Consider your risk tolerance level"
-                ]
-            }
-        elif "budget" in topic or "saving" in topic:
-            ai_response = {
-                "type": "budget",
-                "message": "I'll help you optimize your budget and develop effective saving strategies. We'll analyze your spending patterns and create a personalized savings plan.",
-                "preparation_tips": [
-                    "Gather your recent bank statements",
-                    "List your monthly expenses",
-                    "Identify your savings goals"
-                ]
-            }
-        else:
-            ai_response = {
-                "type": "general",
-                "message": "I look forward to our consultation. To make the most of our session, please prepare any specific questions or financial documents you'd like to discuss.",
-                "preparation_tips": [
-                    "Write down your financial questions",
-                    "Gather relevant financial documents",
-                    "Think about your short and long-term goals"
-                ]
-            }
-        
-        return {
-            "consultation_id": consultation_id,
-            "status": "scheduled",
-            "ai_response": ai_response
-        }
-        
-    except Exception as e:
-        logger.error(f"Error scheduling consultation: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to schedule consultation")
+    consultation_id = uuid.uuid4().hex
+    
+    # Store consultation details
+    consultation = {
+        "id": consultation_id,
+        "name": consultation_request.name,
+        "email": consultation_request.email,
+        "date": consultation_request.date,
+        "time": consultation_request.time,
+        "topic": consultation_request.topic,
+        "status": "scheduled",
+        # A timestamp, formatted only when the consultation is read back
+        "created_at": time.time()
+    }
+    redis = get_redis()
+    if redis is None:
+        consultations[consultation_id] = consultation
+        consultations_by_email.setdefault(consultation["email"], []).append(consultation_id)
+        consultations_by_status.setdefault(consultation["status"], set()).add(consultation_id)
+    else:
+        await redis.set(f"consult:{consultation_id}", orjson.dumps(consultation), ex=CONSULTATION_TTL_SECONDS)
+    
+    # Generate AI response based on consultation topic
+    match = _TOPIC_RE.match(consultation_request.topic)
+    
+    # Prepare personalized response based on topic keywords
+    ai_response = _TOPIC_RESPONSES[match.lastgroup] if match else _GENERAL_RESPONSE
+    
+    return {
+        "consultation_id": consultation_id,
+        "status": "scheduled",
+        "ai_response": ai_response
+    }
 
 @router.get("/consultation/{consultation_id}")
 async def get_consultation(consultation_id: str):
     """Get consultation details and AI analysis"""
-    if consultation_id not in consultations:
+    redis = get_redis()
+    if redis is not None:
+        stored = await redis.get(f"consult:{consultation_id}")
+        if stored is None:
+            raise HTTPException(status_code=404, detail="Consultation not found")
+        consultation = orjson.loads(stored)
+    elif consultation_id in consultations:
+        consultation = consultations[consultation_id]
+    else:
         raise HTTPException(status_code=404, detail="Consultation not found")
-    return consultations[consultation_id]
\ No newline at end of file
+    return {**consultation, "created_at": datetime.fromtimestamp(consultation["created_at"]).isoformat()}
\ No newline at end of file
@@ -1,31 +1,36 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, List, Optional
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import ORJSONResponse
+from typing import Dict, Optional
 from pydantic import BaseModel
 
-from course_data import course_library
+from course_data import course_library, catalog_response
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 class QuizSubmission(BaseModel):
     answers: Dict[str, int]
 
 @router.get("/courses")
-async def get_courses(level: Optional[str] = None) -> List[Dict]:
-    """Get all courses or filter by level"""
-    return course_library.get_courses(level)
+async def get_courses(request: Request, level: Optional[str] = None) -> Response:
+    """Get summaries of all courses or filter by level; the full course is at /courses/{course_id}"""
+    return catalog_response(request, course_library.get_courses_payload(level))
 
 @router.get("/courses/{course_id}")
-async def get_course(course_id: str) -> Dict:
+async def get_course(course_id: str, request: Request) -> Response:
     """Get a specific course by ID"""
-    return course_library.get_course(course_id)
+    return catalog_response(request, course_library.get_course_payload(course_id))
 
 @router.get("/courses/{course_id}/modules/{module_id}")
-async def get_module(course_id: str, module_id: str) -> Dict:
+async def get_module(course_id: str, module_id: str, request: Request) -> Response:
     """Get a specific module from a course"""
-    return course_library.get_module(course_id, module_id)
-
-@router.post("/courses/{course_id}/modules/{module_id}/quiz")
-async def submit_quiz(
+    return catalog_response(request, course_library.get_module_payload(course_id, module_id))
+
+# Progress routes are plain functions, which FastAPI runs in its threadpool, so reads and
+# writes of the SQLite progress store never block the event loop. Progress is trusted dicts:
+# response_model=None keeps FastAPI from turning the return annotations into Pydantic
+# response models and re-validating every response
+@router.post("/courses/{course_id}/modules/{module_id}/quiz", response_model=None)
+def submit_quiz(
     course_id: str, 
     module_id: str, 
     user_id: str,
@@ -34,7 +39,7 @@ async def submit_quiz(
     """Submit quiz answers and get results"""
     return course_library.submit_quiz(course_id, module_id, user_id, submission.answers)
 
-@router.get("/users/{user_id}/progress")
-async def get_user_progress(user_id: str) -> Dict:
+@router.get("/users/{user_id}/progress", response_model=None)
+def get_user_progress(user_id: str) -> Dict:
     """Get user's course progress"""
     return course_library.get_user_progress(user_id)
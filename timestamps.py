@@ -0,0 +1,15 @@
+import time
+
+# (second, formatted) for the last second a timestamp was asked for, swapped as one
+# tuple so threads never see a second paired with another second's string
+_cached = (None, "")
+
+def iso_now() -> str:
+    """Current local time as an ISO 8601 string to the second, formatted once per second"""
+    global _cached
+    second = int(time.time())
+    cached_second, formatted = _cached
+    if second != cached_second:
+        formatted = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(second))
+        _cached = (second, formatted)
+    return formatted
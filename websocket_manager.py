@@ -1,40 +1,213 @@
 import asyncio
-from typing import Dict, Set
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, Union
 from fastapi import WebSocket
 import logging
+import orjson
+
+from redis_store import get_redis
 
 logger = logging.getLogger(__name__)
 
+# With Redis, broadcasts are published on this prefix plus the user id, and every worker
+# delivers them to the sockets it holds
+BROADCAST_CHANNEL_PREFIX = "user:"
+# If the Redis subscription drops, it is retried after this delay, doubling up to the maximum
+SUBSCRIBE_RETRY_SECONDS = 0.5
+MAX_SUBSCRIBE_RETRY_SECONDS = 30.0
+# A socket that takes longer than this to accept a frame is dropped rather than left to
+# pile up messages
+SEND_TIMEOUT_SECONDS = 2.0
+# Connects and disconnects are counted and logged as one summary line this often, so
+# clients reconnecting in a loop don't flood the log
+CONNECTION_LOG_INTERVAL_SECONDS = 60
+
+# The fixed message shapes sent over the sockets. orjson encodes dataclasses natively, in
+# field order, so no dict is built per message
+@dataclass(frozen=True, slots=True, kw_only=True)
+class ChatChunkMessage:
+    type: str = "chat_chunk"
+    content: str
+    timestamp: str
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class ChatResponseMessage:
+    type: str = "chat_response"
+    content: str
+    model: str
+    timestamp: str
+
+BroadcastMessage = Union[ChatChunkMessage, ChatResponseMessage, dict]
+
 class WebSocketManager:
     def __init__(self):
-        self.active_connections: Dict[str, Set[WebSocket]] = {}
+        # A user has a handful of sockets at most (one per tab). Each tuple is replaced, never
+        # mutated, on connect and disconnect, so a broadcast iterates a stable snapshot
+        self.active_connections: Dict[str, Tuple[WebSocket, ...]] = {}
+        # Outgoing (user_id, message) pairs, drained by a consumer task on the server loop
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._redis = None
+        self._subscriber: Optional[asyncio.Task] = None
+        # Per socket: encoded messages waiting to be sent, and the task sending them
+        self._outboxes: Dict[WebSocket, asyncio.Queue] = {}
+        self._senders: Dict[WebSocket, asyncio.Task] = {}
+        # Connection churn since the last summary, logged by the reporter task
+        self._connects = 0
+        self._disconnects = 0
+        self._reporter: Optional[asyncio.Task] = None
         logger.info("WebSocket Manager initialized")
+
+    def start(self):
+        """Start the broadcast consumer; must be called from the server's event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._consumer = asyncio.create_task(self._consume())
+        self._reporter = asyncio.create_task(self._report_connections())
+        self._redis = get_redis()
+        if self._redis is not None:
+            self._subscriber = asyncio.create_task(self._deliver_published())
+
+    async def stop(self):
+        for task in (self._consumer, self._subscriber, self._reporter):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._consumer = None
+        self._subscriber = None
+        self._reporter = None
+        for sender in self._senders.values():
+            sender.cancel()
+        self._senders.clear()
+        self._outboxes.clear()
+
+    def enqueue(self, user_id: str, message: BroadcastMessage):
+        """Queue a message for a user; safe to call from sync code and worker threads"""
+        if self._loop is None or self._loop.is_closed():
+            logger.debug("Broadcast consumer not running, dropping message")
+            return
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (user_id, message))
+
+    async def _consume(self):
+        while True:
+            user_id, message = await self._queue.get()
+            try:
+                await self.broadcast_to_user(user_id, message)
+            except Exception as e:
+                logger.error("Error broadcasting message: %s", e)
+            finally:
+                self._queue.task_done()
     
     async def connect(self, websocket: WebSocket, user_id: str):
         await websocket.accept()
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = set()
-        self.active_connections[user_id].add(websocket)
-        logger.info(f"Client connected. User ID: {user_id}")
+        connections = self.active_connections.get(user_id, ())
+        if websocket not in connections:
+            self.active_connections[user_id] = connections + (websocket,)
+            self._outboxes[websocket] = asyncio.Queue()
+            self._senders[websocket] = asyncio.create_task(self._send_queued(websocket, user_id))
+        self._connects += 1
+        logger.debug("Client connected. User ID: %s", user_id)
     
     def disconnect(self, websocket: WebSocket, user_id: str):
-        if user_id in self.active_connections:
-            self.active_connections[user_id].discard(websocket)
-            if not self.active_connections[user_id]:
+        connections = self.active_connections.get(user_id)
+        if connections is not None:
+            remaining = tuple(connection for connection in connections if connection is not websocket)
+            if remaining:
+                self.active_connections[user_id] = remaining
+            else:
                 del self.active_connections[user_id]
-        logger.info(f"Client disconnected. User ID: {user_id}")
+        self._outboxes.pop(websocket, None)
+        sender = self._senders.pop(websocket, None)
+        if sender is not None:
+            sender.cancel()
+        self._disconnects += 1
+        logger.debug("Client disconnected. User ID: %s", user_id)
     
-    async def broadcast_to_user(self, user_id: str, message: dict):
-        if user_id in self.active_connections:
-            disconnected = set()
-            for connection in self.active_connections[user_id]:
+    async def broadcast_to_user(self, user_id: str, message: BroadcastMessage):
+        # Encoded once for all of the user's sockets, and not at all if none are open here
+        if self._redis is not None:
+            payload = orjson.dumps(message)
+            try:
+                await self._redis.publish(f"{BROADCAST_CHANNEL_PREFIX}{user_id}", payload)
+                return
+            except Exception as e:
+                # Nothing was published, so at least this worker's sockets get the message
+                logger.error("Error publishing message, delivering locally only: %s", e)
+            if user_id in self.active_connections:
+                await self._send_to_local(user_id, payload.decode())
+        elif user_id in self.active_connections:
+            await self._send_to_local(user_id, orjson.dumps(message).decode())
+
+    async def _deliver_published(self):
+        """Forward broadcasts published by any worker to this worker's sockets, resubscribing
+        with backoff whenever the Redis connection drops"""
+        delay = SUBSCRIBE_RETRY_SECONDS
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.psubscribe(f"{BROADCAST_CHANNEL_PREFIX}*")
+                delay = SUBSCRIBE_RETRY_SECONDS
+                async for item in pubsub.listen():
+                    if item["type"] != "pmessage":
+                        continue
+                    user_id = item["channel"].decode()[len(BROADCAST_CHANNEL_PREFIX):]
+                    try:
+                        await self._send_to_local(user_id, item["data"].decode())
+                    except Exception as e:
+                        logger.error("Error delivering published message: %s", e)
+            except Exception as e:
+                logger.error("Redis subscription lost, retrying in %.1fs: %s", delay, e)
+            finally:
                 try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    logger.error(f"Error sending message to client: {str(e)}")
-                    disconnected.add(connection)
-            
-            for connection in disconnected:
-                self.disconnect(connection, user_id)
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_SUBSCRIBE_RETRY_SECONDS)
+
+    async def _report_connections(self):
+        while True:
+            await asyncio.sleep(CONNECTION_LOG_INTERVAL_SECONDS)
+            if self._connects or self._disconnects:
+                logger.info(
+                    "WebSocket clients: %d connected, %d disconnected in the last %ds; %d users online",
+                    self._connects, self._disconnects, CONNECTION_LOG_INTERVAL_SECONDS, len(self.active_connections)
+                )
+                self._connects = 0
+                self._disconnects = 0
+
+    async def _send_to_local(self, user_id: str, payload: str):
+        # Hand the message to each socket's sender, so one slow client doesn't hold up the rest
+        for connection in self.active_connections.get(user_id, ()):
+            outbox = self._outboxes.get(connection)
+            if outbox is not None:
+                outbox.put_nowait(payload)
+
+    async def _send_queued(self, websocket: WebSocket, user_id: str):
+        """Send a socket's queued messages in order, each as its own frame"""
+        outbox = self._outboxes[websocket]
+        try:
+            while True:
+                payload = await outbox.get()
+                await asyncio.wait_for(websocket.send_text(payload), SEND_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning("Client too slow to receive messages, disconnecting. User ID: %s", user_id)
+            await self._drop(websocket, user_id)
+        except Exception as e:
+            logger.error("Error sending message to client: %s", e)
+            await self._drop(websocket, user_id)
+
+    async def _drop(self, websocket: WebSocket, user_id: str):
+        """Close a socket that can't take messages, so its client reconnects, and forget it.
+        Called from the socket's own sender, which disconnect() cancels, so it closes first"""
+        try:
+            await asyncio.wait_for(websocket.close(code=1011), SEND_TIMEOUT_SECONDS)
+        except Exception:
+            pass
+        self.disconnect(websocket, user_id)
 
 websocket_manager = WebSocketManager()
\ No newline at end of file